@@ -0,0 +1,496 @@
+import os
+import sys
+import json
+import random
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from time import perf_counter, strftime
+from contextlib import redirect_stdout
+import numpy as np
+# The modules below import their siblings by name, so their directories must be on the path:
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'Burgess_Model'), os.path.join(ROOT, 'Synthetic_Sequencer')]
+# Custom imports:
+import tpmat as tp
+import markovmetric as mo
+import diagsift
+import seqreader
+import noisify as noise
+import synthseq as seq
+import synthtools as syn
+from Numerical_Tools import differentiate as dif
+
+# The default case grids:
+FACIES_COUNTS = [3, 4, 5, 6, 7, 8, 9, 10]
+SEQUENCE_LENGTHS = [10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+PROFILE_LENGTHS = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+# The parasequence from which the synthetic profiles are built (see 'Workstation/Test runs.py'):
+PARA_DEPTHS = [0, 2.5, 7, 10, 13, 15]
+PARA_LITHOLOGIES = ['SST', 'SHSST', 'SLT', 'SH', 'VAAD']
+PARA_COUNT = 10
+# The number of numberings evaluated per batch, as in main.compute():
+BATCH_SIZE = 5040
+# The modules that must import without the plotting and statistics libraries, and those libraries:
+NUMERIC_MODULES = ['main', 'batch', 'cache', 'significance', 'window', 'anneal', 'synthseq', 'seqreader', 'noisify',
+                   'synthtools', 'sweep', 'Numerical_Tools.stats', 'Post_Burgess.idealseq']
+HEAVY_MODULES = ['matplotlib', 'scipy', 'pandas']
+# Run in a fresh interpreter by measure_import():
+IMPORT_SCRIPT = '''
+import sys, json
+from time import perf_counter
+sys.path[:0] = json.loads(sys.argv[2])
+start = perf_counter()
+__import__(sys.argv[1])
+seconds = perf_counter() - start
+print(json.dumps({'seconds': seconds, 'modules': sorted(sys.modules)}))
+'''
+
+
+# classes, lithologies = random_lithologies(F, N, seed=0):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## F: int; the number of facies classes.
+## N: int; the number of lithological units.
+## seed [optional]: seed of the random number generator. Default = 0.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## classes: a list of F facies classes.
+## lithologies: a list of N lithologies in which no class follows itself, like the output of
+##              synthtools.flagged_reader().
+
+
+def random_lithologies(F: int, N: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    classes = ['F' + str(i) for i in range(F)]
+    codes = np.cumsum(rng.integers(1, F, size=N)) % F
+    return classes, [classes[code] for code in codes.tolist()]
+
+
+# x, y, derivatives, para_boundaries, dicts = synthetic_profile(samples, seed=0):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## samples: int; the approximate number of samples of the profile.
+## seed [optional]: seed of the random number generator. Default = 0.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## The output of synthseq.sequencer() for PARA_COUNT parasequences of PARA_DEPTHS, sampled at the resolution that
+## gives the profile about 'samples' samples.
+
+
+def synthetic_profile(samples: int, seed: int = 0):
+    random.seed(seed)
+    layout = {lith: ['gold', '.'] for lith in PARA_LITHOLOGIES}
+    res = PARA_COUNT * PARA_DEPTHS[-1] / samples
+    return seq.sequencer(list(PARA_DEPTHS), PARA_LITHOLOGIES, layout, res, PARA_COUNT, render=False)
+
+
+# depth_profile, code_profile = random_code_profile(samples, seed=0):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## samples: int; the number of samples of the profile.
+## seed [optional]: seed of the random number generator. Default = 0.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## depth_profile: an array of length 'samples' containing depth values. [m]
+## code_profile: an integer array of length 'samples' containing an index into PARA_LITHOLOGIES per sample, in beds of
+##               1 to 200 samples.
+
+
+def random_code_profile(samples: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    F = len(PARA_LITHOLOGIES)
+    beds = samples // 100 + 1
+    codes = np.cumsum(rng.integers(1, F, size=beds)) % F
+    codes = np.repeat(codes, rng.integers(1, 201, size=beds))[:samples]
+    codes = np.pad(codes, (0, samples - len(codes)), mode='edge')
+    return np.linspace(0, samples / 100, samples), codes
+
+
+# depth_profile, flagged_profile = random_flagged_profile(samples, seed=0):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## samples: int; the number of samples of the profile.
+## seed [optional]: seed of the random number generator. Default = 0.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## depth_profile: an array of length 'samples' containing depth values. [m]
+## flagged_profile: a list of length 'samples' containing the lithologies of random_code_profile() per sample.
+
+
+def random_flagged_profile(samples: int, seed: int = 0):
+    depth_profile, codes = random_code_profile(samples, seed=seed)
+    return depth_profile, [PARA_LITHOLOGIES[code] for code in codes.tolist()]
+
+
+# cases = benchmark_cases(facies_counts=FACIES_COUNTS, sequence_lengths=SEQUENCE_LENGTHS,
+#                         profile_lengths=PROFILE_LENGTHS):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## facies_counts [optional]: list of facies class counts F. Default = FACIES_COUNTS.
+## sequence_lengths [optional]: list of sequence lengths N for the Burgess model functions. Default = SEQUENCE_LENGTHS.
+## profile_lengths [optional]: list of sample counts for the synthetic sequence functions. Default = PROFILE_LENGTHS.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## cases: a list of [name, params, setup, function] entries, in increasing size per function. setup() returns the
+##        arguments of function(), built anew for every call so that functions which modify their input in place are
+##        measured on fresh input; it is not timed. The cost of markov_order() and diagonal_sifter() depends on F only,
+##        so these run on the TP matrix of a sequence of 1000 units for every F. Their batched counterparts, and
+##        tp_stack_from_counts(), run on one batch of BATCH_SIZE (K) random numberings of the same sequence, so that
+##        the time per numbering is the time per call divided by K.
+
+
+def benchmark_cases(facies_counts: list = FACIES_COUNTS, sequence_lengths: list = SEQUENCE_LENGTHS,
+                    profile_lengths: list = PROFILE_LENGTHS) -> list:
+    cases = []
+    # The Burgess model; the sequences are built once, when the case is run:
+    sequences = dict()
+
+    def tp_matrix_args(F, N):
+        if (F, N) not in sequences:
+            sequences.clear()
+            sequences[(F, N)] = random_lithologies(F, N)
+        classes, lithologies = sequences[(F, N)]
+        return lithologies, classes, tuple(range(F))
+
+    for F in facies_counts:
+        for N in sequence_lengths:
+            cases.append(['tpmat.tp_matrix', {'F': F, 'N': N}, lambda F=F, N=N: tp_matrix_args(F, N), tp.tp_matrix])
+    for name, function in [['markovmetric.markov_order', lambda tp_mat, F: mo.markov_order(tp_mat)],
+                           ['diagsift.diagonal_sifter', diagsift.diagonal_sifter]]:
+        for F in facies_counts:
+            classes, lithologies = random_lithologies(F, 1000)
+            tp_mat = tp.tp_matrix(lithologies, classes, tuple(range(F)))[1]
+            cases.append([name, {'F': F, 'N': 1000}, lambda tp_mat=tp_mat, F=F: (tp_mat, F), function])
+
+    # The batched paths main.compute() uses: the transitions are counted once per profile, after which every batch of
+    # numberings is a re-indexing of the same probabilities:
+    for F in facies_counts:
+        for N in sequence_lengths:
+            cases.append(['tpmat.transition_counts', {'F': F, 'N': N},
+                          lambda F=F, N=N: tp_matrix_args(F, N)[:2], tp.transition_counts])
+    for F in facies_counts:
+        classes, lithologies = random_lithologies(F, 1000)
+        probabilities = tp.count_probabilities(*tp.transition_counts(lithologies, classes))
+        numberings = np.argsort(np.random.default_rng(F).random((BATCH_SIZE, F)), axis=1)
+        tp_stack = tp.tp_stack_from_counts(probabilities, numberings)
+        params = {'F': F, 'N': 1000, 'K': BATCH_SIZE}
+        cases.append(['tpmat.tp_stack_from_counts', params,
+                      lambda probabilities=probabilities, numberings=numberings: (probabilities, numberings),
+                      tp.tp_stack_from_counts])
+        for name, function in [['markovmetric.markov_order_batch', mo.markov_order_batch],
+                               ['diagsift.diagonal_sifter_batch', diagsift.diagonal_sifter_batch]]:
+            cases.append([name, params, lambda tp_stack=tp_stack: (tp_stack,), function])
+
+    # The synthetic sequences; the inputs are built once per size, when the first case of that size is run:
+    profiles = dict()
+
+    def profile(samples):
+        if samples not in profiles:
+            profiles.clear()
+            profiles[samples] = synthetic_profile(samples)
+        return profiles[samples]
+
+    def reader_args(samples):
+        x, y, derivatives, para_boundaries, dicts = profile(samples)
+        return x, y, derivatives, para_boundaries, dicts
+
+    def noise_args(samples):
+        x, y, derivatives, para_boundaries, dicts = profile(samples)
+        return (x, y.copy(), [d.copy() for d in derivatives], para_boundaries, dicts, dict(), 0.1)
+
+    def concatenator_args(samples):
+        x = profile(samples)[0]
+        ## One array per layer, each repeating the boundary sample of the previous one, as built by the sequencer:
+        bounds = np.linspace(0, len(x) - 1, PARA_COUNT * len(PARA_LITHOLOGIES) + 1).astype(int)
+        return ([x[bounds[i]:bounds[i + 1] + 1] for i in range(len(bounds) - 1)],)
+
+    flagged = dict()
+
+    def reader_flagged_args(samples):
+        if samples not in flagged:
+            flagged.clear()
+            flagged[samples] = random_flagged_profile(samples)
+        return flagged[samples]
+
+    def reader_code_args(samples):
+        return random_code_profile(samples)
+
+    def derivative_args(samples):
+        x, y = profile(samples)[:2]
+        return x, y
+
+    def stream_args(samples):
+        ## As many parasequences of 1000 samples each as give the profile 'samples' samples:
+        return max(samples // 1000, 1), PARA_DEPTHS[-1] / 1000
+
+    def stream_pipeline(n, res):
+        parasequences = seq.sequencer_stream(PARA_DEPTHS, PARA_LITHOLOGIES, res, n, seed=0)
+        noisy = noise.noise_stream(parasequences, noise.derivative_scales(PARA_DEPTHS), gamma=0.05, seed=0)
+        return seqreader.stream_reader(noisy)
+
+    for name, args, function in [
+            ['seqreader.profile_reader', reader_args, seqreader.profile_reader],
+            ['noisify.gaussian_noise', noise_args,
+             lambda x, y, derivs, bounds, dicts, layout, res: noise.gaussian_noise(x, y, derivs, bounds, dicts, layout,
+                                                                                  res, gamma=0.05, render=False,
+                                                                                  seed=0)],
+            ['synthtools.flagged_reader', reader_flagged_args, syn.flagged_reader],
+            ['synthtools.code_reader', reader_code_args, syn.code_reader],
+            ['seqreader.stream_reader', stream_args, stream_pipeline],
+            ['synthtools.matrix_concatenator', concatenator_args, syn.matrix_concatenator],
+            ['differentiate.differentiate_vector', derivative_args, dif.differentiate_vector]]:
+        for samples in profile_lengths:
+            cases.append([name, {'samples': samples}, lambda args=args, samples=samples: args(samples), function])
+    return cases
+
+
+# seconds, loops, peak_bytes = measure(setup, function, repeats=3, min_time=0.2, budget=10):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## setup: a function returning the arguments of 'function' as a tuple.
+## function: the function to be measured.
+## repeats [optional]: int; the number of timing rounds, of which the fastest is reported. Default = 3.
+## min_time [optional]: float; every round makes as many calls as needed to take at least 'min_time'. Default = 0.2.
+## budget [optional]: float; no further rounds are started once the rounds together took 'budget'. Default = 10. [s]
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## seconds: the wall-clock time per call of the fastest round. [s]
+## loops: the number of calls per round.
+## peak_bytes: the peak memory allocated during one (untimed) call, as traced by tracemalloc; numpy arrays are
+##             included. The arguments themselves are allocated before tracing starts and are not counted.
+
+
+def measure(setup, function, repeats: int = 3, min_time: float = 0.2, budget: float = 10):
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        # Calibrate the number of calls per round:
+        loops = 1
+        while True:
+            elapsed = 0
+            for _ in range(loops):
+                args = setup()
+                start = perf_counter()
+                function(*args)
+                elapsed += perf_counter() - start
+            if elapsed >= min_time or loops >= 10 ** 6:
+                break
+            loops *= 10 if elapsed < min_time / 10 else 2
+        rounds = [elapsed / loops]
+        total = elapsed
+        # Further rounds:
+        while len(rounds) < repeats and total < budget:
+            elapsed = 0
+            for _ in range(loops):
+                args = setup()
+                start = perf_counter()
+                function(*args)
+                elapsed += perf_counter() - start
+            rounds.append(elapsed / loops)
+            total += elapsed
+        # Peak memory of a separate call, as tracing slows the call down:
+        args = setup()
+        tracemalloc.start()
+        function(*args)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return min(rounds), loops, peak_bytes
+
+
+# report = run_benchmarks(cases, budget=10, only=None):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## cases: a list of cases, as obtained from benchmark_cases().
+## budget [optional]: float; once a call of a case takes longer than 'budget', the cases of the same function with
+##                    the same params and an equal or larger size (the last entry of params, e.g. N or samples) are
+##                    skipped. Default = 10. [s]
+## only [optional]: a list of function names; if given, only these are measured. Default = None.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## report: a dictionary containing the machine description under 'meta' and under 'results' a list with per case
+##         the name, params, seconds, loops and peak_bytes. Skipped cases have seconds = None.
+
+
+def run_benchmarks(cases: list, budget: float = 10, only: list = None) -> dict:
+    results = []
+    ## The smallest size that took too long, per function and params other than the size:
+    too_slow = dict()
+    for name, params, setup, function in cases:
+        if only is not None and name not in only:
+            continue
+        label = name + ' ' + ', '.join(key + '=' + str(value) for key, value in params.items())
+        group = (name,) + tuple(params.items())[:-1]
+        size = list(params.values())[-1]
+        if group in too_slow and size >= too_slow[group]:
+            print(label + ': skipped')
+            results.append({'name': name, 'params': params, 'seconds': None, 'loops': 0, 'peak_bytes': None})
+            continue
+        seconds, loops, peak_bytes = measure(setup, function, budget=budget)
+        print(label + ': ' + format_seconds(seconds) + ', peak ' + format_bytes(peak_bytes))
+        results.append({'name': name, 'params': params, 'seconds': seconds, 'loops': loops, 'peak_bytes': peak_bytes})
+        if seconds > budget:
+            too_slow[group] = min(size, too_slow.get(group, size))
+    meta = {'date': strftime('%Y-%m-%d %H:%M:%S'), 'python': platform.python_version(), 'numpy': np.__version__,
+            'platform': platform.platform(), 'processor': platform.processor(), 'cpus': os.cpu_count()}
+    return {'meta': meta, 'results': results}
+
+
+# seconds, heavy = measure_import(module, repeats=5):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## module: the name of the module, as imported by the scripts (e.g. 'main' or 'Numerical_Tools.stats').
+## repeats [optional]: int; the number of fresh interpreters in which the module is imported. Default = 5.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## seconds: the fastest import time of 'module' over the interpreters, excluding the start of the interpreter. [s]
+## heavy: a list containing the modules of HEAVY_MODULES that were loaded by the import.
+
+
+def measure_import(module: str, repeats: int = 5):
+    paths = json.dumps(sys.path[:3])
+    times = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT, module, paths], capture_output=True, text=True,
+                                check=True, cwd=ROOT).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        times.append(result['seconds'])
+    loaded = set(name.split('.')[0] for name in result['modules'])
+    return min(times), [name for name in HEAVY_MODULES if name in loaded]
+
+
+# results, heavy_imports = import_benchmarks(modules=NUMERIC_MODULES):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## modules [optional]: a list of module names. Default = NUMERIC_MODULES.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## results: a list containing per module a result named 'import' with params {'module': module}, in the format of
+##          run_benchmarks(), plus the loaded heavy modules under 'heavy'.
+## heavy_imports: a list containing the modules that loaded any of HEAVY_MODULES.
+
+
+def import_benchmarks(modules: list = NUMERIC_MODULES):
+    results = []
+    heavy_imports = []
+    for module in modules:
+        seconds, heavy = measure_import(module)
+        print('import ' + module + ': ' + format_seconds(seconds) +
+              ('' if len(heavy) == 0 else ', loads ' + ', '.join(heavy)))
+        results.append({'name': 'import', 'params': {'module': module}, 'seconds': seconds, 'loops': 1,
+                        'peak_bytes': None, 'heavy': heavy})
+        if len(heavy) > 0:
+            heavy_imports.append(module)
+    return results, heavy_imports
+
+
+# regressions = compare_reports(report, baseline, tolerance=0.1):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## report: a report, as obtained from run_benchmarks().
+## baseline: a report saved earlier, e.g. before an optimisation.
+## tolerance [optional]: float; a case regresses if it is more than a fraction 'tolerance' slower than, or allocates
+##                       more than a fraction 'tolerance' more memory than, the baseline. Default = 0.1.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## regressions: a list containing the labels of the regressed cases. Prints per case that was measured in both
+##              reports the speedup and the memory ratio with respect to the baseline.
+
+
+def compare_reports(report: dict, baseline: dict, tolerance: float = 0.1) -> list:
+    previous = dict()
+    for result in baseline['results']:
+        previous[(result['name'], json.dumps(result['params'], sort_keys=True))] = result
+    regressions = []
+    for result in report['results']:
+        old = previous.get((result['name'], json.dumps(result['params'], sort_keys=True)))
+        if old is None or old['seconds'] is None or result['seconds'] is None:
+            continue
+        label = result['name'] + ' ' + ', '.join(key + '=' + str(value) for key, value in result['params'].items())
+        speedup = old['seconds'] / result['seconds']
+        line = label + ': ' + format_seconds(old['seconds']) + ' -> ' + format_seconds(result['seconds']) + \
+            ' (x' + str(round(speedup, 2)) + ')'
+        regressed = speedup < 1 / (1 + tolerance)
+        if result['peak_bytes'] is not None and old['peak_bytes'] is not None:
+            regressed = regressed or result['peak_bytes'] / max(old['peak_bytes'], 1) > 1 + tolerance
+            line += ', peak ' + format_bytes(old['peak_bytes']) + ' -> ' + format_bytes(result['peak_bytes'])
+        print(line + (' REGRESSION' if regressed else ''))
+        if regressed:
+            regressions.append(label)
+    return regressions
+
+
+# string = format_seconds(seconds):
+## seconds: a duration. [s]
+## string: the duration with a fitting unit.
+def format_seconds(seconds: float) -> str:
+    for unit, scale in [['s', 1], ['ms', 1e-3], ['us', 1e-6]]:
+        if seconds >= scale:
+            return str(round(seconds / scale, 3)) + ' ' + unit
+    return str(round(seconds / 1e-9, 1)) + ' ns'
+
+
+# string = format_bytes(size):
+## size: a memory size. [bytes]
+## string: the size with a fitting unit.
+def format_bytes(size: int) -> str:
+    for unit, scale in [['GB', 2 ** 30], ['MB', 2 ** 20], ['kB', 2 ** 10]]:
+        if size >= scale:
+            return str(round(size / scale, 2)) + ' ' + unit
+    return str(size) + ' B'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time and trace the peak memory of the numerical hot paths.')
+    parser.add_argument('--output', default=os.path.join(ROOT, 'Benchmarks', 'results.json'),
+                        help='file to which the results are written as JSON')
+    parser.add_argument('--baseline', default=None, help='results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed relative slowdown or memory increase')
+    parser.add_argument('--budget', type=float, default=10,
+                        help='seconds per call after which the larger cases of a function are skipped')
+    parser.add_argument('--only', nargs='+', default=None, help='names of the functions to measure')
+    parser.add_argument('--quick', action='store_true', help='measure the three smallest sizes only')
+    arguments = parser.parse_args()
+
+    if arguments.quick:
+        cases = benchmark_cases(FACIES_COUNTS, SEQUENCE_LENGTHS[:3], PROFILE_LENGTHS[:3])
+    else:
+        cases = benchmark_cases()
+    report = run_benchmarks(cases, budget=arguments.budget, only=arguments.only)
+    ## The import times of the numerical modules ('--only import' measures these only):
+    heavy_imports = []
+    if arguments.only is None or 'import' in arguments.only:
+        import_results, heavy_imports = import_benchmarks()
+        report['results'] += import_results
+    with open(arguments.output, 'w') as file:
+        json.dump(report, file, indent=1)
+    print('Results written to ' + arguments.output)
+
+    if arguments.baseline is not None:
+        with open(arguments.baseline) as file:
+            baseline = json.load(file)
+        print('Comparison with ' + arguments.baseline + ':')
+        if len(compare_reports(report, baseline, tolerance=arguments.tolerance)) > 0:
+            sys.exit(1)
+    if len(heavy_imports) > 0:
+        print('Plotting or statistics libraries are loaded by importing ' + ', '.join(heavy_imports) + '.')
+        sys.exit(1)
@@ -0,0 +1,125 @@
+import heapq
+from math import exp
+from time import perf_counter
+import numpy as np
+# Custom imports:
+import tpmat as tp
+import markovmetric as mo
+import branchbound as bb
+
+
+# spread = numbering_spread(weights, numbering):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## weights: array with shape (F, F) containing the transition probabilities in order of 'classes', with a zero
+##          diagonal.
+## numbering: integer array of length F; the code of every class.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## spread: max_j S_j - min_j S_j over the (j=j, j=-F+j) diagonal pairs, i.e. F times the Markov order metric (up to
+##         rounding). Computed directly from the transition probabilities, without building the TP matrix; see the
+##         note in branchbound.py.
+
+
+def numbering_spread(weights: np.ndarray, numbering: np.ndarray) -> float:
+    F = len(numbering)
+    offsets = (numbering[None, :] - numbering[:, None]) % F
+    sums = np.bincount(offsets.ravel(), weights=weights.ravel(), minlength=F)[1:]
+    return sums.max() - sums.min()
+
+
+# numberings, m, trace = anneal_search(probabilities, evaluations=None, time_limit=None, top_k=10, seed=None,
+#                                      t_start=0.2, t_end=0.01, cycles=4):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## probabilities: array with shape (F, F) containing the transition probabilities in order of 'classes', as obtained
+##                from tpmat.count_probabilities().
+## evaluations [optional]: int; the maximum number of numberings evaluated. Default = None.
+## time_limit [optional]: float; the maximum wall-clock time of the search. Default = None. [s]
+##                        If neither 'evaluations' nor 'time_limit' is given, 100000 evaluations are made; if both
+##                        are, the search stops at whichever is reached first.
+## top_k [optional]: int; the number of best numberings that are kept. Default = 10.
+## seed [optional]: seed of the random number generator, for reproducible searches. Default = None.
+## t_start [optional]: float; the initial temperature, in units of the spread F*m. Default = 0.2.
+## t_end [optional]: float; the final temperature; the temperature decreases geometrically within every cycle.
+##                   Default = 0.01.
+## cycles [optional]: int; the budget is split into 'cycles' equal cooling cycles, each of which restarts from the
+##                    best numbering found so far at temperature 't_start'. Default = 4.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## numberings: integer array with shape (<=top_k, F) containing the best numberings found, highest m first.
+## m: array containing their Markov order metrics; bit-identical to markovmetric.markov_order().
+## trace: array with shape (T, 3); every row holds (evaluations, elapsed time [s], best m so far) at the moments the
+##        best m improved, plus a final row at the end of the search.
+
+
+def anneal_search(probabilities: np.ndarray, evaluations: int = None, time_limit: float = None, top_k: int = 10,
+                  seed: int = None, t_start: float = 0.2, t_end: float = 0.01, cycles: int = 4):
+    if evaluations is None and time_limit is None:
+        evaluations = 100000
+    F = len(probabilities)
+    rng = np.random.default_rng(seed)
+    weights = probabilities.copy()
+    np.fill_diagonal(weights, 0)
+
+    # Start from the greedy numbering:
+    current = np.asarray(bb.greedy_numbering(probabilities), dtype=np.intp)
+    current_spread = numbering_spread(weights, current)
+    # Bounded min-heap of (spread, numbering) of the best distinct numberings found so far:
+    kept = [(current_spread, tuple(current.tolist()))]
+    kept_set = {kept[0][1]}
+    best_spread = current_spread
+    start = perf_counter()
+    trace = [(1, 0.0, best_spread / F)]
+
+    evaluation = 1
+    current_cycle = 0
+    while F > 2:
+        ## Stop once the budget is spent; the fraction used sets the temperature:
+        elapsed = perf_counter() - start
+        used = 0.0
+        if evaluations is not None:
+            used = max(used, evaluation / evaluations)
+        if time_limit is not None:
+            used = max(used, elapsed / time_limit)
+        if used >= 1:
+            break
+        ## Restart from the best numbering found at the start of every new cycle:
+        cycle = int(used * cycles)
+        if cycle > current_cycle:
+            current_cycle = cycle
+            current_spread, numbering = max(kept)
+            current = np.asarray(numbering, dtype=np.intp)
+        temperature = t_start * (t_end / t_start) ** (used * cycles - cycle)
+
+        ## Swap the codes of two classes:
+        a, b = rng.integers(F), rng.integers(F - 1)
+        b += b >= a
+        candidate = current.copy()
+        candidate[a], candidate[b] = current[b], current[a]
+        spread = numbering_spread(weights, candidate)
+        evaluation += 1
+
+        ## Metropolis acceptance:
+        if spread >= current_spread or rng.random() < exp((spread - current_spread) / temperature):
+            current, current_spread = candidate, spread
+            numbering = tuple(current.tolist())
+            if numbering not in kept_set and (len(kept) < top_k or spread > kept[0][0]):
+                if len(kept) >= top_k:
+                    kept_set.discard(heapq.heappop(kept)[1])
+                heapq.heappush(kept, (spread, numbering))
+                kept_set.add(numbering)
+            if spread > best_spread:
+                best_spread = spread
+                trace.append((evaluation, elapsed, best_spread / F))
+    trace.append((evaluation, perf_counter() - start, best_spread / F))
+
+    # Recompute the metric of the kept numberings exactly as the exhaustive search does:
+    numberings = np.asarray(sorted(kept_set), dtype=np.intp).reshape(-1, F)
+    m = mo.markov_order_batch(tp.tp_stack_from_counts(probabilities, numberings))
+    order = np.argsort(-m, kind='stable')
+    return numberings[order], m[order], np.asarray(trace)
@@ -0,0 +1,117 @@
+from concurrent.futures import ProcessPoolExecutor
+# Custom imports:
+import markovmetric as mo
+import symmetry as sym
+import main as burg
+
+# The layout and search options of the batch, set once per worker process by init_worker():
+worker_layout = None
+worker_options = None
+
+
+# init_worker(layout, options):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## layout: a dictionary containing as key:value pairs 'facies class:[color, hatch]', shared by all wells.
+## options: a dictionary containing the keyword arguments passed on to main.compute().
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## Stores 'layout' and 'options' in the worker process and builds the permutation and diagonal index tables for
+## F = len(layout), so that every well evaluated by this worker reuses them.
+
+
+def init_worker(layout: dict, options: dict) -> None:
+    global worker_layout, worker_options
+    worker_layout = layout
+    worker_options = options
+    F = len(layout)
+    sym.all_numberings(F)
+    sym.canonical_numberings(F)
+    mo.diagonal_tables(F)
+
+
+# result1, result2, result3 = compute_well(well):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## well: a tuple (depths, lithologies) describing one stratigraphic log, see main.compute().
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## result1, result2, result3: the output of main.compute() for the well.
+
+
+def compute_well(well: tuple):
+    depths, lithologies = well
+    return burg.compute(depths, lithologies, worker_layout, **worker_options)
+
+
+# results = compute_batch(wells, layout, workers=None, **options):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## wells: a list of (depths, lithologies) tuples, one per stratigraphic log. All logs use the facies classes of
+##        'layout'.
+## layout: a dictionary containing as key:value pairs 'facies class:[color, hatch]', shared by all wells.
+## workers [optional]: int; the number of worker processes over which the wells are divided. Default = None, in
+##                     which case the wells are computed one by one in the current process.
+## options [optional]: keyword arguments passed on to main.compute() for every well, e.g. search='anneal', seed=0 or
+##                     cache_dir. The 'workers' of main.compute() itself are not available, as the wells are divided
+##                     over the workers instead. A 'telemetry' object only records the wells computed in the current
+##                     process; with workers, every worker process records into its own copy.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## results: a list containing a (result1, result2, result3) triple per well, in the order of 'wells'; identical to
+##          calling main.compute() on every well separately. The permutation and diagonal index tables are built
+##          once per process instead of once per well.
+
+
+def compute_batch(wells: list, layout: dict, workers: int = None, **options) -> list:
+    if workers is None:
+        init_worker(layout, options)
+        return [compute_well(well) for well in wells]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(layout, options)) as executor:
+        return list(executor.map(compute_well, wells))
+
+
+# results = main_batch(wells, layout, res, n, filepaths, workers=None, render=True, render_workers=None, **kwargs):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## wells: a list of (depths, lithologies) tuples, one per stratigraphic log.
+## layout: a dictionary containing as key:value pairs 'facies class:[color, hatch]', shared by all wells.
+## res: the desired resolution. [m]
+## n: the number of (para)sequences.
+## filepaths: a list containing, per well, the directory to which its figures are saved.
+## workers [optional]: int; the number of worker processes over which the wells are divided. Default = None
+##                     (one by one).
+## render [optional]: if False, no figures are made. Default = True.
+## render_workers [optional]: the number of worker processes over which the figures of a well are rendered.
+##                            Default = None.
+## kwargs [optional]: 'fmt', 'dpi' and 'queue_depth' are passed on to main.render_results(), 'telemetry' to both
+##                    compute_batch() and main.render_results(), and all others (e.g. 'search', 'seed' or
+##                    'cache_dir') to compute_batch().
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## results: a list containing a (result1, result2, result3) triple per well, in the order of 'wells'.
+## VISUALIZATIONS: the figures of main.main() for every well, saved in the corresponding entry of 'filepaths'.
+
+
+def main_batch(wells: list, layout: dict, res: float, n: int, filepaths: list, workers: int = None,
+               render: bool = True, render_workers: int = None, **kwargs) -> list:
+    if len(filepaths) != len(wells):
+        raise ValueError('main_batch needs one filepath per well; got ' + str(len(filepaths)) + ' filepaths for ' +
+                         str(len(wells)) + ' wells.')
+    render_options = {key: kwargs.pop(key) for key in ('fmt', 'dpi', 'queue_depth') if key in kwargs}
+    if 'telemetry' in kwargs:
+        render_options['telemetry'] = kwargs['telemetry']
+    results = compute_batch(wells, layout, workers=workers, **kwargs)
+    if render:
+        for i in range(len(wells)):
+            burg.render_results(wells[i][0], wells[i][1], layout, res, n, filepaths[i], *results[i],
+                                workers=render_workers, **render_options)
+    return results
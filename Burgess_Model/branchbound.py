@@ -0,0 +1,182 @@
+import numpy as np
+# Custom imports:
+import tpmat as tp
+import markovmetric as mo
+import symmetry as sym
+
+
+# A short note on the formulation used here:
+# ======================================================================================================================
+## A transition from class a (code p[a]) to class b (code p[b]) lands in the TP matrix at row F-1-p[a], column p[b].
+## Its anti-diagonal offset is therefore (p[b] - p[a]) mod F: the (j=j, j=-F+j) diagonal pair collects exactly the
+## transitions whose code difference is j (mod F), and self-transitions (j=0) fall on the patched-out diagonal.
+## The Markov order metric of a numbering is thus (max_j S_j - min_j S_j) / F, where S_j is the summed probability of
+## all transitions with code difference j. The search below assigns codes one class at a time and bounds S_j from
+## above by the probability that could still end up on the j-th diagonal pair.
+# ======================================================================================================================
+
+
+# numbering = greedy_numbering(probabilities):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## probabilities: array with shape (F, F) containing the transition probabilities in order of 'classes', as obtained
+##                from tpmat.count_probabilities().
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## numbering: tuple of size F; a numbering obtained by following the most probable transitions from the class with
+##            the largest transition weight. Used as the first incumbent of the search.
+
+
+def greedy_numbering(probabilities: np.ndarray) -> tuple:
+    F = len(probabilities)
+    weights = probabilities.copy()
+    np.fill_diagonal(weights, 0)
+    # Start at the class with the largest total transition weight and follow the most probable unvisited transition:
+    current = int(np.argmax(weights.sum(axis=0) + weights.sum(axis=1)))
+    numbering = [0] * F
+    visited = [current]
+    for code in range(1, F):
+        row = weights[current].copy()
+        row[visited] = -1
+        current = int(np.argmax(row))
+        numbering[current] = code
+        visited.append(current)
+    return tuple(numbering)
+
+
+# upper_bound = spread_bound(sums, probabilities, assigned, codes, unassigned, free_codes):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## sums: array of length F; sums[j] is the probability already fixed on the j-th diagonal pair (sums[0] is unused).
+## probabilities: array with shape (F, F) containing the transition probabilities in order of 'classes'.
+## assigned: integer array containing the classes that have been given a code.
+## codes: integer array, same length as 'assigned', containing their codes.
+## unassigned: integer array containing the classes that have not been given a code yet.
+## free_codes: integer array, same length as 'unassigned', containing the codes that are still available.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## upper_bound: an upper bound of (max_j S_j - min_j S_j) over all completions of the partial numbering.
+
+
+def spread_bound(sums: np.ndarray, probabilities: np.ndarray, assigned: np.ndarray, codes: np.ndarray,
+                 unassigned: np.ndarray, free_codes: np.ndarray) -> float:
+    F = len(probabilities)
+    reachable = np.zeros(F)
+    # Every class sends at most one transition to, and receives at most one from, each offset. So an offset can
+    # receive no more than the largest probability per class that could still be placed on it:
+    ## Transitions between an assigned and an unassigned class can only land on offsets reachable by a free code:
+    if len(assigned) > 0 and len(unassigned) > 0:
+        outgoing = probabilities[assigned][:, unassigned].max(axis=1)
+        incoming = probabilities[unassigned][:, assigned].max(axis=0)
+        for k in range(len(assigned)):
+            reachable[(free_codes - codes[k]) % F] += outgoing[k]
+            reachable[(codes[k] - free_codes) % F] += incoming[k]
+    ## Transitions between two unassigned classes can land on any difference of two free codes:
+    if len(unassigned) > 1:
+        block = probabilities[unassigned][:, unassigned].copy()
+        np.fill_diagonal(block, 0)
+        free_weight = min(block.max(axis=1).sum(), block.max(axis=0).sum())
+        differences = np.unique((free_codes[:, None] - free_codes[None, :]) % F)
+        reachable[differences] += free_weight
+    # The largest spread puts all reachable weight on one pair and nothing on a different one:
+    highest = sums[1:] + reachable[1:]
+    lowest = sums[1:]
+    spreads = highest[:, None] - lowest[None, :]
+    if F > 2:
+        np.fill_diagonal(spreads, -np.inf)
+    return float(np.max(spreads))
+
+
+# numberings, m = max_order_search(probabilities, tolerance=1e-9, symmetric=True):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## probabilities: array with shape (F, F) containing the transition probabilities in order of 'classes', as obtained
+##                from tpmat.count_probabilities().
+## tolerance [optional]: slack on the pruning test, in units of m. Partial numberings are only pruned if their bound
+##                       falls short of the incumbent by more than 'tolerance', so ties that only differ by rounding
+##                       are never lost. Default = 1e-9.
+## symmetric [optional]: if True, only one member of every symmetry class (see symmetry.py) is searched and the
+##                       maxima are expanded afterwards. The result is the same; the search is 2F times smaller.
+##                       Default = True.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## numberings: integer array with shape (K, F) containing every numbering with the maximum Markov order metric, in
+##             the order in which itertools.permutations(range(F)) produces them.
+## m: array of length K containing their Markov order metrics (all equal to m_max); bit-identical to the values that
+##    markovmetric.markov_order() returns for the corresponding TP matrices.
+
+
+def max_order_search(probabilities: np.ndarray, tolerance: float = 1e-9, symmetric: bool = True):
+    F = len(probabilities)
+    # Assign the classes with the largest transition weights first; they constrain the bound the most:
+    weights = probabilities.copy()
+    np.fill_diagonal(weights, 0)
+    order = np.argsort(-(weights.sum(axis=0) + weights.sum(axis=1)), kind='stable')
+
+    # Initial incumbent from the greedy numbering:
+    greedy = np.asarray([greedy_numbering(probabilities)], dtype=np.intp)
+    incumbent = F * mo.markov_order_batch(tp.tp_stack_from_counts(probabilities, greedy))[0]
+    slack = F * tolerance
+
+    # Depth-first search over partial numberings:
+    numbering = np.full(F, -1, dtype=np.intp)
+    sums = np.zeros(F)
+    candidates = []  # (Will contain [spread, numbering] pairs within 'slack' of the incumbent)
+
+    def descend(depth: int):
+        nonlocal incumbent
+        ## A complete numbering: compare its spread to the incumbent:
+        if depth == F:
+            spread = np.max(sums[1:]) - np.min(sums[1:])
+            if spread >= incumbent - slack:
+                candidates.append([spread, tuple(numbering.tolist())])
+                incumbent = max(incumbent, spread)
+            return
+        current = order[depth]
+        assigned = order[:depth]
+        codes = numbering[assigned]
+        ### With symmetric=True, fix the first class at code 0 (code shifts) and the second in the lower half
+        ### (reversal); every symmetry class keeps at least one member that satisfies both:
+        allowed = range(F)
+        if symmetric and F >= 3 and depth == 0:
+            allowed = range(1)
+        elif symmetric and F >= 3 and depth == 1:
+            allowed = range(1, F // 2 + 1)
+        for code in allowed:
+            if code in codes:
+                continue
+            ### Fix the transitions between the current class and every assigned class:
+            outgoing = (codes - code) % F
+            incoming = (code - codes) % F
+            sums[incoming] += probabilities[assigned, current]
+            sums[outgoing] += probabilities[current, assigned]
+            numbering[current] = code
+            ### Only descend if the bound can still reach the incumbent:
+            unassigned = order[depth + 1:]
+            free_codes = np.setdiff1d(np.arange(F), numbering[order[:depth + 1]])
+            if spread_bound(sums, probabilities, order[:depth + 1], numbering[order[:depth + 1]], unassigned,
+                            free_codes) >= incumbent - slack:
+                descend(depth + 1)
+            ### Undo the assignment:
+            numbering[current] = -1
+            sums[incoming] -= probabilities[assigned, current]
+            sums[outgoing] -= probabilities[current, assigned]
+
+    descend(0)
+
+    # Recompute the metric of the surviving candidates exactly as the exhaustive search does:
+    survivors = [candidate[1] for candidate in candidates if candidate[0] >= incumbent - slack]
+    survivors = np.asarray(sorted(survivors), dtype=np.intp).reshape(-1, F)
+    if symmetric:
+        ## Every member of a surviving symmetry class reaches the same spread, up to rounding:
+        survivors, m = sym.expand_numberings(probabilities, survivors)
+    else:
+        m = mo.markov_order_batch(tp.tp_stack_from_counts(probabilities, survivors))
+    m_max = np.max(m)
+    return survivors[m == m_max], m[m == m_max]
@@ -0,0 +1,252 @@
+import os
+from time import time
+import hashlib
+from math import factorial
+import numpy as np
+# Custom imports:
+from Numerical_Tools import faciesseq as fs
+from Post_Burgess import idealseq
+import tpmat as tp
+
+# Part of every cache key; bump whenever a change alters the numbers returned by main.compute(), so that results
+# computed by older code are never returned:
+LIBRARY_VERSION = '1'
+# The default upper bound on the total size of a cache directory:
+CACHE_SIZE = 2 ** 30  # [bytes]
+# The age after which a temporary file left by an interrupted write is removed by evict():
+STALE_TMP_AGE = 3600  # [s]
+
+
+# key = cache_key(lithologies, classes, options):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## lithologies: a list containing the lithologies, as strings, of the profile. Length (N).
+## classes: a list of all unique facies classes, size F.
+## options: a dictionary containing the search options that change the results (search, expand, top_k, threshold).
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## key: hexadecimal string; the SHA-256 hash of the integer-coded lithology sequence, the class list, the options and
+##      LIBRARY_VERSION. The depths do not enter the key, as the results only depend on the order of the lithologies.
+
+
+def cache_key(lithologies: list, classes: list, options: dict) -> str:
+    codes = fs.facies_codes(lithologies, classes).astype(np.int64)
+    digest = hashlib.sha256()
+    digest.update(LIBRARY_VERSION.encode())
+    digest.update(repr(list(classes)).encode())
+    digest.update(repr(sorted(options.items())).encode())
+    digest.update(codes.tobytes())
+    return digest.hexdigest()
+
+
+# ranks = numbering_ranks(numberings):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## numberings: integer array with shape (K, F) containing K numberings.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## ranks: integer array of length K containing the position of every numbering in the order in which
+##        itertools.permutations(range(F)) produces them, using the smallest integer type that holds F! - 1.
+
+
+def numbering_ranks(numberings: np.ndarray) -> np.ndarray:
+    K, F = numberings.shape
+    ranks = np.zeros(K, dtype=np.int64)
+    for i in range(F):
+        ## The number of smaller codes to the right of position i, in the factorial number system:
+        smaller = np.sum(numberings[:, i + 1:] < numberings[:, i:i + 1], axis=1)
+        ranks += smaller * factorial(F - 1 - i)
+    return ranks.astype(np.min_scalar_type(max(factorial(F) - 1, 0)))
+
+
+# numberings = ranked_numberings(ranks, F):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## ranks: integer array of length K, as obtained from numbering_ranks().
+## F: int; the number of facies classes.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## numberings: integer array with shape (K, F); the inverse of numbering_ranks().
+
+
+def ranked_numberings(ranks: np.ndarray, F: int) -> np.ndarray:
+    remainder = np.asarray(ranks, dtype=np.int64).copy()
+    available = np.tile(np.arange(F, dtype=np.intp), (len(remainder), 1))
+    numberings = np.empty((len(remainder), F), dtype=np.intp)
+    for i in range(F):
+        digit = remainder // factorial(F - 1 - i)
+        remainder %= factorial(F - 1 - i)
+        numberings[:, i] = np.take_along_axis(available, digit[:, None], axis=1)[:, 0]
+        ## Remove the chosen codes, keeping the remaining ones in ascending order:
+        keep = np.arange(F - i)[None, :] != digit[:, None]
+        available = available[keep].reshape(len(remainder), F - 1 - i)
+    return numberings
+
+
+# store_results(cache_dir, key, classes, numberings, result1, result2, sifted, max_bytes=CACHE_SIZE):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## cache_dir: string containing the directory of the cache.
+## key: the cache key of the results, as obtained from cache_key().
+## classes: a list of all unique facies classes, size F.
+## numberings: integer array containing the numberings of result1, or None if result1 is None.
+## result1, result2: the output of main.compute().
+## sifted: a list containing the indices of the entries in 'result2' that make up result3.
+## max_bytes [optional]: the maximum total size of the cache directory; the least recently used entries are removed
+##                       once it is exceeded. Default = CACHE_SIZE.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## Saves the metric vector, the compact ranks of the numberings, the maximum m-value candidates and the indices of
+## the sifted candidates to '<cache_dir>/<key>.npz'. The TP matrices themselves are not stored.
+
+
+def store_results(cache_dir: str, key: str, classes: list, numberings: np.ndarray, result1: list, result2: list,
+                  sifted: list, max_bytes: int = CACHE_SIZE) -> None:
+    os.makedirs(cache_dir, exist_ok=True)
+    F = len(classes)
+    # The maximum m-value candidates and the sifted candidates among them:
+    max_numberings = np.asarray([[entry[2][c] for c in classes] for entry in result2], dtype=np.intp).reshape(-1, F)
+    entries = {'max_ranks': numbering_ranks(max_numberings),
+               'max_m': np.asarray([entry[1] for entry in result2], dtype=float),
+               'sifted': np.asarray(sifted, dtype=np.intp)}
+    # The distribution:
+    if result1 is not None:
+        entries['ranks'] = numbering_ranks(np.asarray(numberings))
+        entries['m'] = result1[1]
+        if len(result1) > 3:
+            entries['hist_counts'], entries['hist_edges'] = result1[3], result1[4]
+    # Write to a temporary file first, so that an interrupted run never leaves a corrupt entry:
+    path = os.path.join(cache_dir, key + '.npz')
+    temporary_path = path + '.' + str(os.getpid()) + '.tmp'
+    with open(temporary_path, 'wb') as file:
+        np.savez(file, **entries)
+    os.replace(temporary_path, path)
+    evict(cache_dir, max_bytes)
+
+
+# result1, result2, result3 = load_results(cache_dir, key, lithologies, classes):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## cache_dir: string containing the directory of the cache.
+## key: the cache key of the results, as obtained from cache_key().
+## lithologies: a list containing the lithologies, as strings, of the profile. Length (N).
+## classes: a list of all unique facies classes, size F.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## result1, result2, result3: the results stored under 'key', rebuilt in the format of main.compute(); or None if the
+##                            cache holds no entry for 'key'.
+
+
+def load_results(cache_dir: str, key: str, lithologies: list, classes: list):
+    path = os.path.join(cache_dir, key + '.npz')
+    if not os.path.isfile(path):
+        return None
+    with np.load(path) as file:
+        entries = dict(file)
+    # Mark the entry as recently used:
+    os.utime(path)
+    F = len(classes)
+    probabilities = tp.count_probabilities(*tp.transition_counts(lithologies, classes))
+    # Rebuild result1:
+    result1 = None
+    if 'ranks' in entries:
+        numberings = ranked_numberings(entries['ranks'], F)
+        dict_storage = [dict(zip(classes, numbering)) for numbering in numberings.tolist()]
+        result1 = [tp.tp_stack_from_counts(probabilities, numberings), entries['m'], dict_storage]
+        if 'hist_counts' in entries:
+            result1 += [entries['hist_counts'], entries['hist_edges']]
+    # Rebuild result2 and result3:
+    max_numberings = ranked_numberings(entries['max_ranks'], F)
+    max_matrices = tp.tp_stack_from_counts(probabilities, max_numberings)
+    result2 = []
+    for i in range(len(max_numberings)):
+        result2.append([max_matrices[i], entries['max_m'][i], dict(zip(classes, max_numberings[i].tolist()))])
+    result3 = []
+    for i in entries['sifted']:
+        ideal_sequence = idealseq.ideal_order(result2[i][0], result2[i][2])
+        result3.append([result2[i][0], result2[i][1], result2[i][2], ideal_sequence])
+    return result1, result2, result3
+
+
+# evict(cache_dir, max_bytes=CACHE_SIZE):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## cache_dir: string containing the directory of the cache.
+## max_bytes [optional]: the maximum total size of the cache directory. Default = CACHE_SIZE.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## Removes the least recently used entries until the total size of the cache is at most 'max_bytes', and the
+## temporary files of interrupted writes older than STALE_TMP_AGE. Entries removed meanwhile by another process
+## are skipped.
+
+
+def evict(cache_dir: str, max_bytes: int = CACHE_SIZE) -> None:
+    now = time()
+    stats = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        if name.endswith('.npz'):
+            stats.append((stat.st_mtime, stat.st_size, path))
+        elif name.endswith('.tmp') and now - stat.st_mtime > STALE_TMP_AGE:
+            remove(path)
+    stats.sort()
+    total = sum(stat[1] for stat in stats)
+    for mtime, size, path in stats:
+        if total <= max_bytes:
+            break
+        remove(path)
+        total -= size
+
+
+# remove(path):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## path: string containing the path of a file in the cache.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## Removes the file at 'path', if it still exists.
+
+
+def remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# clear_cache(cache_dir, key=None):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## cache_dir: string containing the directory of the cache.
+## key [optional]: the cache key of a single entry, as obtained from cache_key(). Default = None (all entries).
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## Removes the entry stored under 'key', or every entry of the cache if no key is given.
+
+
+def clear_cache(cache_dir: str, key: str = None) -> None:
+    if not os.path.isdir(cache_dir):
+        return
+    for name in os.listdir(cache_dir):
+        if name.endswith('.npz') and (key is None or name == key + '.npz'):
+            remove(os.path.join(cache_dir, name))
@@ -1,4 +1,6 @@
 import numpy as np
+# Custom imports:
+import markovmetric as mo
 
 
 # diag_sum = diagonal_sum(tp_matrix, F, j):
@@ -57,3 +59,52 @@ def diagonal_sifter(tp_matrix: np.ndarray, F: int) -> bool:
     else:
         ## Otherwise, return False:
         return False
+
+
+# diag_sums = diagonal_sum_batch(tp_stack):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## tp_stack: array with shape (P, F, F) containing P transition probability matrices.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## diag_sums: array with shape (P, F-1); diag_sums[p, j-1] equals diagonal_sum(tp_stack[p], F, j), bit for bit.
+## markovmetric.diagonal_pair_sums() is not reused here: it sums each diagonal of a pair separately and adds the two
+## totals, whereas diagonal_sum() keeps one running sum over the upper and then the lower diagonal. The two orders can
+## differ in the last bit, which would change the outcome of diagonal_sifter() when two pairs (nearly) tie.
+
+
+def diagonal_sum_batch(tp_stack: np.ndarray) -> np.ndarray:
+    P, F = tp_stack.shape[0], tp_stack.shape[1]
+    # Reuse the anti-diagonal index tables of the Markov order metric:
+    lower_index, upper_index = mo.diagonal_tables(F)
+    ## Flatten the matrices and append a zero cell for the padded table entries:
+    flat = np.zeros((P, F*F + 1))
+    flat[:, :F*F] = tp_stack.reshape(P, F*F)
+    # Accumulate the upper diagonal first and the lower diagonal second, as diagonal_sum() does:
+    diag_sums = np.zeros((P, F-1))
+    for i in range(F):
+        diag_sums += flat[:, upper_index[:, i]]
+    for i in range(F):
+        diag_sums += flat[:, lower_index[:, i]]
+    return diag_sums
+
+
+# bools = diagonal_sifter_batch(tp_stack):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## tp_stack: array with shape (P, F, F) containing P transition probability matrices.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## bools: boolean array of length P; for each matrix the result of diagonal_sifter().
+
+
+def diagonal_sifter_batch(tp_stack: np.ndarray) -> np.ndarray:
+    # Calculate for every matrix and every diagonal-pair its sum value:
+    diag_sums = diagonal_sum_batch(tp_stack)
+    # Find out if the max diagonal sum is at the (j=1,j=-(F-1)) or (j=-1,j=F-1) diagonals:
+    max_sums = np.max(diag_sums, axis=1)
+    return (diag_sums[:, 0] == max_sums) | (diag_sums[:, -1] == max_sums)
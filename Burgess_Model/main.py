@@ -1,32 +1,85 @@
 # Standard imports:
-import sys
 from typing import Tuple, List
-from time import sleep
+from math import factorial
 import os
 import numpy as np
-import math
-from itertools import permutations
-from matplotlib import pyplot as plt
-# Custom imports:
-from Visualization_Tools import profile_visualizers as vp
-from Visualization_Tools import matrix_visualizers as mv
+# Custom imports (the plotting modules are imported by render_results(), so that computing needs no matplotlib):
 from Post_Burgess import idealseq
 import tpmat as tp
 import markovmetric as mo
 import diagsift
+import branchbound as bb
+import symmetry as sym
+import streaming as st
+import parallel as par
+import cache as ch
+import anneal as an
+import telemetry as tm
 
 
-# result1, result2 = main(depths, lithologies, colors, patterns):
+# indices = sifted_indices(result2):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## result2: a list of [tp_matrix, m, facies_dict] entries, as obtained from compute().
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## indices: a list containing the indices of the entries in 'result2' whose probabilities are aligned on the
+##          (j=1,j=-(F-1)) or (j=-1,j=F-1) diagonal pairs; these entries make up result3.
+
+
+def sifted_indices(result2: list) -> list:
+    if len(result2) == 0:
+        return []
+    return list(np.flatnonzero(diagsift.diagonal_sifter_batch(np.asarray([entry[0] for entry in result2]))))
+
+
+# result1, result2, result3 = compute(depths, lithologies, layout, search='exhaustive', expand=False, top_k=None,
+#                                     threshold=None, workers=None, evaluations=None, time_limit=None, seed=None,
+#                                     cache_dir=None, cache_size=2**30, telemetry=None):
 # ======================================================================================================================
 # INPUT:
 # ======================================================================================================================
 ## depths: a list containing the depths (in meters) at which lithology boundaries occur of length (N + 1).
 ## lithologies: a list containing the lithologies, as strings, corresponding to the lithological units
 ##              defined by the boundaries in 'depths'. Length (N).
-## layout: a dictionary containing as key:value pairs 'facies class:[color, hatch]'.
-## res: the desired resolution. [m]
-## n: the number of (para)sequences.
-## filepath: string containing the directory and filename to which the figures are saved.
+## layout: a dictionary containing as key:value pairs 'facies class:[color, hatch]'. Its keys are the facies classes.
+## search [optional]: 'exhaustive' evaluates all F! numberings; 'branch_bound' runs an exact branch-and-bound search
+##                    for the highest m-values only, which makes F = 10-12 feasible. In that case result1 is None and
+##                    no distribution histogram is made. 'symmetric' evaluates one numbering per symmetry class
+##                    (code shifts and reversal leave m unchanged), i.e. F!/(2F) numberings; result1, result2 and
+##                    result3 then only hold these representatives. 'streaming' evaluates all F! numberings in
+##                    batches but only keeps those selected by 'top_k' and/or 'threshold'; the histogram is built
+##                    online and result1 only holds the kept numberings. 'anneal' runs a simulated annealing search
+##                    with swap moves within the budget set by 'evaluations' and/or 'time_limit'; like
+##                    'branch_bound' it only yields the highest m-values found (result1 is None), but these are not
+##                    guaranteed to be the global maximum. Default = 'exhaustive'.
+## expand [optional]: if True and search = 'symmetric', the representatives are expanded back to all F! numberings,
+##                    so that result1, result2 and result3 are identical to the exhaustive search. Default = False.
+## top_k [optional]: if search = 'streaming', the number of highest m-value numberings to keep. Default = None.
+## threshold [optional]: if search = 'streaming', keep only numberings with m >= threshold. Default = None.
+## workers [optional]: if search = 'exhaustive', the number of worker processes over which the numberings are
+##                     sharded; the output is identical to the serial run. The other searches run in the current
+##                     process only; giving workers with them raises a ValueError. On Windows, call main() from within
+##                     an 'if __name__ == "__main__":' block when using workers. Default = None (serial).
+## evaluations [optional]: if search = 'anneal', the maximum number of numberings evaluated. Default = None.
+## time_limit [optional]: if search = 'anneal', the maximum duration of the search in seconds. Default = None.
+##                        Without either, 100000 numberings are evaluated.
+## seed [optional]: if search = 'anneal', the seed of the random number generator. Default = None.
+## cache_dir [optional]: string containing a directory in which the results are cached, keyed by the lithology
+##                       sequence, the facies classes and the search options. A repeated run returns the cached
+##                       results instead of searching again; see cache.py. Runs with search = 'anneal' are only
+##                       cached if 'seed' is given and 'time_limit' is not, as their results are not repeatable
+##                       otherwise. Default = None (no caching).
+## cache_size [optional]: the maximum size of 'cache_dir' in bytes; the least recently used results are removed
+##                        beyond it. Default = 1 GiB.
+## telemetry [optional]: a telemetry.Telemetry object that records the wall time, throughput and (optionally) peak
+##                       memory of every stage and receives the progress events instead of the progress bar. If
+##                       search = 'anneal', the record of the 'search' stage also holds the convergence trace of
+##                       anneal.anneal_search() under 'trace'; a list of [evaluations, elapsed time [s], best m so
+##                       far] rows, to judge the quality of the result against the time spent. Results returned from
+##                       'cache_dir' have no search stage. Default = None (no instrumentation).
 # ======================================================================================================================
 # OUTPUT:
 # ======================================================================================================================
@@ -37,6 +90,10 @@ import diagsift
 ##      matrices in 'tp_mat_storage'.
 ##      3. dict_storage: a list of length (F!), containing dictionaries with the facies coding
 ##      of each TP matrix in 'tp_mat_storage'.
+##      None if search = 'branch_bound' or 'anneal'. If search = 'streaming', two more entries hold the online
+##      histogram:
+##      4. hist_counts: the number of numberings per bin.
+##      5. hist_edges: the bin edges of 'hist_counts'.
 ## result2: a list containing the highest m-value results from the distribution (subset of result1). Each entry is
 ## of the format [tp_matrix, m, facies_dict]:
 ##      tp_matrix: the TP matrix.
@@ -47,6 +104,152 @@ import diagsift
 ##          [tp_matrix, m, facies_dict, ideal_sequence] in similar fashion to 'result2' except for:
 ##      ideal_sequence: a list of length F containing, top-down, the ideal order of facies classes corresponding to
 ##                      'tp_matrix'.
+## Nothing is drawn or saved; see render_results() for the figures.
+
+
+def compute(depths: list, lithologies: list, layout: dict, search: str = 'exhaustive', expand: bool = False,
+            top_k: int = None, threshold: float = None, workers: int = None, evaluations: int = None,
+            time_limit: float = None, seed: int = None, cache_dir: str = None, cache_size: int = ch.CACHE_SIZE,
+            telemetry: tm.Telemetry = None) -> Tuple[list, list, list]:
+    if search not in ('exhaustive', 'branch_bound', 'symmetric', 'streaming', 'anneal'):
+        raise ValueError("search must be 'exhaustive', 'branch_bound', 'symmetric', 'streaming' or 'anneal', not " +
+                         repr(search))
+    if workers is not None and search != 'exhaustive':
+        raise ValueError("workers only applies to search='exhaustive', not " + repr(search))
+    # The facies classes, in order of 'layout':
+    classes = list(layout)
+    F = len(classes)
+
+    # Count the transitions once; every numbering is then a re-indexing of the same probabilities:
+    counts, totals = tp.transition_counts(lithologies, classes)
+    probabilities = tp.count_probabilities(counts, totals)
+
+    # Return the stored results if the same profile has been searched before; an annealing search without a seed or
+    # with a wall-clock limit gives different results on every run and is never cached:
+    reproducible = search != 'anneal' or (seed is not None and time_limit is None)
+    if cache_dir is not None and reproducible:
+        key = ch.cache_key(lithologies, classes, {'search': search, 'expand': expand, 'top_k': top_k,
+                                                  'threshold': threshold, 'evaluations': evaluations,
+                                                  'time_limit': time_limit, 'seed': seed})
+        results = ch.load_results(cache_dir, key, lithologies, classes)
+        if results is not None:
+            return results
+
+    # Search the numberings:
+    with tm.stage(telemetry, 'search') as record:
+        if search in ('branch_bound', 'anneal'):
+            # Search for the highest m-values only; the full distribution (result1) is not computed:
+            if search == 'branch_bound':
+                print('\nSearching for the maximum Markov order metric...')
+                max_numberings, max_m = bb.max_order_search(probabilities)
+            else:
+                print('\nAnnealing facies numberings...')
+                numberings, markov_storage, trace = an.anneal_search(probabilities, evaluations=evaluations,
+                                                                     time_limit=time_limit, seed=seed)
+                record['items'] = int(trace[-1, 0])
+                record['trace'] = trace.tolist()
+                print('Best m = ' + str(round(trace[-1, 2], 4)) + ' after ' + str(record['items']) + ' evaluations.')
+                ## Every member of the symmetry classes of the best numberings shares their m-value:
+                max_numberings, max_m = sym.expand_maxima(probabilities, numberings, markov_storage)
+            max_matrices = tp.tp_stack_from_counts(probabilities, max_numberings)
+            result1 = None
+            result2 = []
+            for i in range(len(max_numberings)):
+                result2.append([max_matrices[i], max_m[i], dict(zip(classes, max_numberings[i].tolist()))])
+        else:
+            if search == 'streaming':
+                # Keep only the best numberings in a bounded heap and build the distribution of m values online:
+                print('\nStreaming TP matrices...')
+                numberings, markov_storage, hist_counts, hist_edges = st.stream_search(probabilities, top_k=top_k,
+                                                                                       threshold=threshold)
+                record['items'] = factorial(F)
+                tp_mat_storage = tp.tp_stack_from_counts(probabilities, numberings)
+            else:
+                # For every possible facies numbering, calculate a TP matrix and corresponding Markov order:
+                if search == 'symmetric':
+                    ## One representative per symmetry class suffices; the others share its m-value:
+                    numberings = sym.canonical_numberings(F)
+                else:
+                    numberings = sym.all_numberings(F)
+                record['items'] = len(numberings)
+                if workers is not None and search == 'exhaustive':
+                    ## Evaluate the metrics in a process pool, sharded by leading codes:
+                    print('\nComputing TP matrices on ' + str(workers) + ' workers...')
+                    markov_storage = par.parallel_search(probabilities, workers=workers)
+                    tp_mat_storage = tp.tp_stack_from_counts(probabilities, numberings)
+                else:
+                    P = len(numberings)
+                    tp_mat_storage = np.empty((P, F, F))  # (Will contain arrays)
+                    markov_storage = np.empty(P)  # (Will contain scalars)
+                    print('\nComputing TP matrices...')
+                    progress = tm.progress_callback(telemetry, 'search')
+                    ## Evaluate the numberings in batches of 'chunk' matrices at a time:
+                    chunk = 5040
+                    for start in range(0, P, chunk):
+                        stop = min(start + chunk, P)
+                        tp_mat_storage[start:stop] = tp.tp_stack_from_counts(probabilities, numberings[start:stop])
+                        markov_storage[start:stop] = mo.markov_order_batch(tp_mat_storage[start:stop])
+                        progress(stop, P)
+                ## Expand the representatives back to all F! numberings if asked:
+                if search == 'symmetric' and expand:
+                    numberings, markov_storage = sym.expand_numberings(probabilities, numberings)
+                    tp_mat_storage = tp.tp_stack_from_counts(probabilities, numberings)
+            ## Store the corresponding facies coding:
+            dict_storage = [dict(zip(classes, numbering)) for numbering in numberings.tolist()]  # (Will contain dicts)
+
+            # Prepare output:
+            ## Prepare output result1:
+            result1 = [tp_mat_storage, markov_storage, dict_storage]
+            if search == 'streaming':
+                result1 += [hist_counts, hist_edges]
+            ## Prepare output result2:
+            result2 = []
+            if len(markov_storage) > 0:
+                m_max = np.max(markov_storage)
+                for i in np.flatnonzero(markov_storage == m_max):
+                    result2.append([tp_mat_storage[i], markov_storage[i], dict_storage[i]])
+
+    ## Prepare output result3, including the ideal sequence of each matrix:
+    with tm.stage(telemetry, 'sift', items=len(result2), unit='matrices'):
+        result3 = []
+        indices = sifted_indices(result2)
+        for i in indices:
+            ideal_sequence = idealseq.ideal_order(result2[i][0], result2[i][2])
+            result3.append([result2[i][0], result2[i][1], result2[i][2], ideal_sequence])
+
+    # Store the results for later runs:
+    if cache_dir is not None and reproducible:
+        ch.store_results(cache_dir, key, classes, None if result1 is None else numberings, result1, result2, indices,
+                         max_bytes=cache_size)
+
+    return result1, result2, result3
+
+
+# render_results(depths, lithologies, layout, res, n, filepath, result1, result2, result3, workers=None, fmt='png',
+#                dpi=None, queue_depth=None, telemetry=None):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## depths: a list containing the depths (in meters) at which lithology boundaries occur of length (N + 1).
+## lithologies: a list containing the lithologies, as strings, corresponding to the lithological units
+##              defined by the boundaries in 'depths'. Length (N).
+## layout: a dictionary containing as key:value pairs 'facies class:[color, hatch]'.
+## res: the desired resolution. [m]
+## n: the number of (para)sequences.
+## filepath: string containing the directory and filename to which the figures are saved.
+## result1, result2, result3: the output of compute() for the same profile.
+## workers [optional]: the number of worker processes over which the coded profiles, TP matrices and ideal sequences
+##                     are rendered. Default = None (rendered one by one).
+## fmt [optional]: the output format of the figures, e.g. 'png', 'pdf' or 'svg'. Default = 'png'.
+## dpi [optional]: the resolution of the figures in dots per inch. Default = None (matplotlib's default).
+## queue_depth [optional]: the maximum number of figures queued for the workers at any time. Default = None
+##                         (two per worker).
+## telemetry [optional]: a telemetry.Telemetry object that records the wall time, throughput and (optionally) peak
+##                       memory of every stage and receives the progress events instead of the progress bar.
+##                       Default = None (no instrumentation).
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
 ## VISUALIZATIONS:
 ##      1. The vertical profile with depth and thicknesses.
 ##      2. A histogram displaying the distribution of m-values.
@@ -57,110 +260,192 @@ import diagsift
 ##          lithology bar and a different colormap.
 
 
-def main(depths: list, lithologies: list, layout: dict, res: float, n: int, filepath: str) -> Tuple[list, list, list]:
-    # Visualize the vertical profile and obtain the facies classes:
-    classes = vp.vertical_profile(depths, lithologies, layout, res, dimensions=(0.1*(4*n), 4*n),
-                                  filepath=filepath + '\Vertical Profile.png')
-    F = len(classes)
+def render_results(depths: list, lithologies: list, layout: dict, res: float, n: int, filepath: str, result1: list,
+                   result2: list, result3: list, workers: int = None, fmt: str = 'png', dpi: float = None,
+                   queue_depth: int = None, telemetry: tm.Telemetry = None) -> None:
+    from matplotlib import pyplot as plt
+    from Visualization_Tools import profile_visualizers as vp
+    from Visualization_Tools import renderpool as rp
+    with plt.rc_context({} if dpi is None else {'figure.dpi': dpi}):
+        # Visualize the vertical profile and obtain the facies classes:
+        with tm.stage(telemetry, 'profile', items=1, unit='figures'):
+            classes = vp.vertical_profile(depths, lithologies, layout, res, dimensions=(0.1*(4*n), 4*n),
+                                          filepath=rp.figure_path(filepath + '\\Vertical Profile.png', fmt))
 
-    # For every possible facies numbering, calculate a TP matrix and corresponding Markov order:
-    tp_mat_storage = []  # (Will contain arrays)
-    markov_storage = []  # (Will contain scalars)
-    dict_storage = []  # (Will contain dictionaries)
-    print('\nComputing TP matrices...')
-    i = 0
-    for numbering in permutations(range(F)):
-        facies_dict, tp_mat = tp.tp_matrix(lithologies, classes, numbering)
-        ## Store the TP matrix:
-        tp_mat_storage.append(tp_mat)
-        ## Store the corresponding m-value:
-        markov_storage.append(mo.markov_order(tp_mat))
-        ## Store the corresponding facies coding:
-        dict_storage.append(facies_dict)
-
-        ## Progress bar:
-        sys.stdout.write('\r')
-        j = (i + 1) / math.factorial(F)
-        sys.stdout.write("[%-20s] %d%%" % ('=' * int(20 * j), 100 * j))
-        sys.stdout.flush()
-        sleep(0.25)
-        i += 1
-
-    ## Convert the storage lists to workable arrays:
-    tp_mat_storage = np.asarray(tp_mat_storage)
-    markov_storage = np.asarray(markov_storage)
-
-    # Now create a distribution of m values and visualize:
-    n_hist, bins, edges = plt.hist(markov_storage, bins=24, color='green', alpha=0.7, edgecolor='black',
-                                   weights=np.ones_like(markov_storage) / math.factorial(F))
-    plt.xlim(0, np.max(markov_storage))
-    plt.ylim(0, max(n_hist) + 0.2 * max(n_hist))
-    plt.xlabel('Markov Order Metric m [-]')
-    plt.ylabel('Relative Frequency [-]')
-    plt.title('Markov Order Metric Distribution, F = ' + str(len(classes)), weight='semibold')
-    if filepath is None:
-        plt.show()
-    else:
-        plt.savefig(filepath + '\Markov Order Metric Distribution.png', bbox_inches='tight')
-    plt.close()
-
-    # Prepare output:
-    ## Prepare output result1:
-    result1 = [tp_mat_storage, markov_storage, dict_storage]
-    ## Prepare output result2:
-    m_max = np.max(markov_storage)
-    result2 = []
-    for i in range(math.factorial(F)):
-        if markov_storage[i] == m_max:
-            result2.append([tp_mat_storage[i], markov_storage[i], dict_storage[i]])
-    ## Prepare output result3:
-    indices = []
-    result3 = []
-    for i in range(len(result2)):
-        if diagsift.diagonal_sifter(result2[i][0], F):
-            indices.append(i)
-            result3.append([result2[i][0], result2[i][1], result2[i][2]])
+        # Now create a distribution of m values and visualize:
+        if result1 is not None:
+            with tm.stage(telemetry, 'histogram', items=1, unit='figures'):
+                markov_storage = result1[1]
+                if len(result1) > 3:
+                    ## Re-bin the online histogram into 24 bins between the lowest and highest m-value for display:
+                    hist_counts, hist_edges = result1[3], result1[4]
+                    filled = np.flatnonzero(hist_counts)
+                    m_low, m_high = hist_edges[filled[0]], hist_edges[filled[-1] + 1]
+                    hist_values = np.clip((hist_edges[:-1] + hist_edges[1:]) / 2, m_low, m_high)
+                    hist_weights = hist_counts / np.sum(hist_counts)
+                    hist_bins = np.linspace(m_low, m_high, 25)
+                else:
+                    hist_values = markov_storage
+                    hist_weights = np.ones_like(markov_storage) / len(markov_storage)
+                    hist_bins = 24
+                    m_high = np.max(markov_storage)
+                n_hist, bins, edges = plt.hist(hist_values, bins=hist_bins, color='green', alpha=0.7,
+                                               edgecolor='black', weights=hist_weights)
+                plt.xlim(0, m_high)
+                plt.ylim(0, max(n_hist) + 0.2 * max(n_hist))
+                plt.xlabel('Markov Order Metric m [-]')
+                plt.ylabel('Relative Frequency [-]')
+                plt.title('Markov Order Metric Distribution, F = ' + str(len(classes)), weight='semibold')
+                if filepath is None:
+                    plt.show()
+                else:
+                    plt.savefig(rp.figure_path(filepath + '\\Markov Order Metric Distribution.png', fmt),
+                                bbox_inches='tight')
+                plt.close()
+
+    # The entries of result3 are numbered after their position in result2:
+    indices = sifted_indices(result2)
 
-    # Visualize for each entry in result2 the TP matrix and the coded profile:
+    # Collect the figures of every entry in result2 as render jobs:
     os.makedirs(filepath + '\Coded Profiles', exist_ok=True)
     os.makedirs(filepath + '\TP Matrices', exist_ok=True)
-    print('\nCreating figures...')
-    for i in range(len(result2)):
-        ## Create coded profile and save the figure:
-        vp.coded_profile(depths, lithologies, classes, result2[i][2], layout, res, n,
-                         filepath=filepath + '\Coded Profiles\Coded Profile No.' + str(i + 1) + '.png',
-                         title='Markov Order Metric \n m = ' + str(round(result2[i][1], 2)))
-        ## Create visualization of the TP matrix and save the figure:
-        mv.matrix_imager(result2[i][0], classes, result2[i][2], layout,
-                         filepath=filepath + '\TP Matrices\TP Matrix No.' + str(i + 1) + '.png',
-                         title='Markov Order Metric m = ' + str(round(result2[i][1], 2)))
-
-        ## Progress bar:
-        sys.stdout.write('\r')
-        j = (i + 1) / len(result2)
-        sys.stdout.write("[%-20s] %d%%" % ('=' * int(20 * j), 100 * j))
-        sys.stdout.flush()
-        sleep(0.25)
-
-    # Highlight the ideal matrices from result3 with a different colormap and create ideal sequences:
     os.makedirs(filepath + '\Ideal Sequences', exist_ok=True)
+    jobs = []
+    ideal_jobs = []
+    for i in range(len(result2)):
+        ## The coded profile:
+        jobs.append(('coded_profile', (depths, lithologies, classes, result2[i][2], layout, res, n),
+                     {'filepath': rp.figure_path(filepath + '\Coded Profiles\Coded Profile No.' + str(i + 1) + '.png',
+                                                 fmt),
+                      'title': 'Markov Order Metric \n m = ' + str(round(result2[i][1], 2))}))
+        ## The TP matrix; the ideal matrices from result3 are drawn with an opposing colormap and an ideal sequence
+        ## lithology bar instead:
+        matrix_kwargs = {'filepath': rp.figure_path(filepath + '\TP Matrices\TP Matrix No.' + str(i + 1) + '.png',
+                                                    fmt),
+                         'title': 'Markov Order Metric m = ' + str(round(result2[i][1], 2))}
+        if i in indices:
+            matrix_kwargs.update({'ideal': True, 'cmap': 'Oranges'})
+        jobs.append(('matrix_imager', (result2[i][0], classes, result2[i][2], layout), matrix_kwargs))
     for i in range(len(result3)):
-        ## Recreate the TP matrix visualization, but now with an opposing colormap:
-        ideal_sequence = mv.matrix_imager(result3[i][0], classes, result3[i][2], layout, ideal=True,
-                                          filepath=filepath + '\TP Matrices\TP Matrix No.' + str(indices[i] + 1) +
-                                          '.png', title='Markov Order Metric m = ' + str(round(result3[i][1], 2)),
-                                          cmap='Oranges')
-        ## Create ideal sequence:
-        ideal_depths, ideal_sequence_order = idealseq.ideal_sequencer(depths, lithologies, result3[i][0], result3[i][2],
-                                                                      ideal_sequence, layout, filepath=filepath +
-                                                                      '\Ideal Sequences\Ideal Sequence Thicknesses No.'
-                                                                      + str(indices[i] + 1) + '.png')
-        ideal_depths, ideal_sequence_order = idealseq.ideal_sequencer(depths, lithologies, result3[i][0], result3[i][2],
-                                                                      ideal_sequence, layout, proportional=True,
-                                                                      filepath=filepath +
-                                                                      '\Ideal Sequences\Ideal Sequence Proportions No.'
-                                                                      + str(indices[i] + 1) + '.png')
-        ## Add the ideal sequence to result3:
-        result3[i].append(ideal_sequence)
+        ## The ideal sequences, in thicknesses and in proportions:
+        ideal_args = (depths, lithologies, result3[i][0], result3[i][2], result3[i][3], layout)
+        ideal_jobs.append(('ideal_sequencer', ideal_args,
+                           {'filepath': rp.figure_path(filepath + '\Ideal Sequences\Ideal Sequence Thicknesses No.' +
+                                                       str(indices[i] + 1) + '.png', fmt)}))
+        ideal_jobs.append(('ideal_sequencer', ideal_args,
+                           {'proportional': True,
+                            'filepath': rp.figure_path(filepath + '\Ideal Sequences\Ideal Sequence Proportions No.' +
+                                                       str(indices[i] + 1) + '.png', fmt)}))
+
+    # Render the figures:
+    print('\nCreating figures...')
+    with tm.stage(telemetry, 'candidates', items=len(jobs), unit='figures'):
+        rp.render_jobs(jobs, workers=workers, queue_depth=queue_depth, dpi=dpi,
+                       callback=tm.progress_callback(telemetry, 'candidates'))
+    if len(ideal_jobs) > 0:
+        print('\nCreating ideal sequences...')
+        with tm.stage(telemetry, 'ideal sequences', items=len(ideal_jobs), unit='figures'):
+            rp.render_jobs(ideal_jobs, workers=workers, queue_depth=queue_depth, dpi=dpi,
+                           callback=tm.progress_callback(telemetry, 'ideal sequences'))
+
+    return
+
+
+# result1, result2, result3 = main(depths, lithologies, layout, res, n, filepath, **kwargs):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## depths: a list containing the depths (in meters) at which lithology boundaries occur of length (N + 1).
+## lithologies: a list containing the lithologies, as strings, corresponding to the lithological units
+##              defined by the boundaries in 'depths'. Length (N).
+## layout: a dictionary containing as key:value pairs 'facies class:[color, hatch]'.
+## res: the desired resolution. [m]
+## n: the number of (para)sequences.
+## filepath: string containing the directory and filename to which the figures are saved.
+## search [optional]: 'exhaustive' evaluates all F! numberings; 'branch_bound' runs an exact branch-and-bound search
+##                    for the highest m-values only, which makes F = 10-12 feasible. In that case result1 is None and
+##                    no distribution histogram is made. 'symmetric' evaluates one numbering per symmetry class
+##                    (code shifts and reversal leave m unchanged), i.e. F!/(2F) numberings; result1, result2 and
+##                    result3 then only hold these representatives. 'streaming' evaluates all F! numberings in
+##                    batches but only keeps those selected by 'top_k' and/or 'threshold'; the histogram is built
+##                    online and result1 only holds the kept numberings. 'anneal' runs a simulated annealing search
+##                    with swap moves within the budget set by 'evaluations' and/or 'time_limit'; like
+##                    'branch_bound' it only yields the highest m-values found (result1 is None), but these are not
+##                    guaranteed to be the global maximum. Default = 'exhaustive'.
+## expand [optional]: if True and search = 'symmetric', the representatives are expanded back to all F! numberings,
+##                    so that result1, result2 and result3 are identical to the exhaustive search. Default = False.
+## top_k [optional]: if search = 'streaming', the number of highest m-value numberings to keep. Default = None.
+## threshold [optional]: if search = 'streaming', keep only numberings with m >= threshold. Default = None.
+## workers [optional]: if search = 'exhaustive', the number of worker processes over which the numberings are
+##                     sharded; the output is identical to the serial run. The other searches run in the current
+##                     process only; giving workers with them raises a ValueError. On Windows, call main() from within
+##                     an 'if __name__ == "__main__":' block when using workers. Default = None (serial).
+## evaluations [optional]: if search = 'anneal', the maximum number of numberings evaluated. Default = None.
+## time_limit [optional]: if search = 'anneal', the maximum duration of the search in seconds. Default = None.
+##                        Without either, 100000 numberings are evaluated.
+## seed [optional]: if search = 'anneal', the seed of the random number generator. Default = None.
+## cache_dir [optional]: string containing a directory in which the results are cached, keyed by the lithology
+##                       sequence, the facies classes and the search options. A repeated run returns the cached
+##                       results instead of searching again; see cache.py. Runs with search = 'anneal' are only
+##                       cached if 'seed' is given and 'time_limit' is not, as their results are not repeatable
+##                       otherwise. Default = None (no caching).
+## cache_size [optional]: the maximum size of 'cache_dir' in bytes; the least recently used results are removed
+##                        beyond it. Default = 1 GiB.
+## render [optional]: if False, only the numbers are computed and no figures are made; the figures can still be
+##                    made later by passing the results to render_results(). Default = True.
+## render_workers [optional]: the number of worker processes over which the figures are rendered. Default = None.
+## fmt [optional]: the output format of the figures, e.g. 'png', 'pdf' or 'svg'. Default = 'png'.
+## dpi [optional]: the resolution of the figures in dots per inch. Default = None (matplotlib's default).
+## telemetry [optional]: a telemetry.Telemetry object that records the wall time, throughput and (optionally) peak
+##                       memory of every stage and receives the progress events instead of the progress bar. If
+##                       search = 'anneal', the record of the 'search' stage also holds the convergence trace of
+##                       anneal.anneal_search() under 'trace'; a list of [evaluations, elapsed time [s], best m so
+##                       far] rows, to judge the quality of the result against the time spent. Results returned from
+##                       'cache_dir' have no search stage. Default = None (no instrumentation).
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## result1: a list containing three entries:
+##      1. tp_mat_storage: an array of length (F!), containing all TP matrices for all possible
+##      row and column orders.
+##      2. markov_storage: an array of length (F!), containing all m-values corresponding to the
+##      matrices in 'tp_mat_storage'.
+##      3. dict_storage: a list of length (F!), containing dictionaries with the facies coding
+##      of each TP matrix in 'tp_mat_storage'.
+##      None if search = 'branch_bound' or 'anneal'. See compute() for the streaming case.
+## result2: a list containing the highest m-value results from the distribution (subset of result1). Each entry is
+## of the format [tp_matrix, m, facies_dict]:
+##      tp_matrix: the TP matrix.
+##      m: the Markov order corresponding to the TP matrix (according to the equation in Burgess (2016)).
+##      facies_dict: a dictionary containing the facies coding for the TP matrix.
+## result3: a list containing the highest m-value results with probabilities aligned on the (j=1,j=-(F-1)) or
+##          (j=-1,j=F-1) diagonal pairs (subset of result2). Each entry is of the format
+##          [tp_matrix, m, facies_dict, ideal_sequence] in similar fashion to 'result2' except for:
+##      ideal_sequence: a list of length F containing, top-down, the ideal order of facies classes corresponding to
+##                      'tp_matrix'.
+## VISUALIZATIONS:
+##      1. The vertical profile with depth and thicknesses.
+##      2. A histogram displaying the distribution of m-values.
+##      3. For the highest m-values in the distribution:
+##          - The TP matrices along with lithologies and probability values, saved in 'filepath'.
+##          - The vertical profile in coded format, in similar fashion to Burgess (2016), saved in 'filepath'.
+##      4. Those matrices with their TP's aligned on the j=1 or j=-1 diagonal pairs receive an ideal sequence
+##          lithology bar and a different colormap.
+
 
+def main(depths: list, lithologies: list, layout: dict, res: float, n: int, filepath: str,
+         search: str = 'exhaustive', expand: bool = False, top_k: int = None, threshold: float = None,
+         workers: int = None, render: bool = True, render_workers: int = None, fmt: str = 'png',
+         dpi: float = None, evaluations: int = None, time_limit: float = None, seed: int = None,
+         cache_dir: str = None, cache_size: int = ch.CACHE_SIZE,
+         telemetry: tm.Telemetry = None) -> Tuple[list, list, list]:
+    # Compute the results:
+    result1, result2, result3 = compute(depths, lithologies, layout, search=search, expand=expand, top_k=top_k,
+                                        threshold=threshold, workers=workers, evaluations=evaluations,
+                                        time_limit=time_limit, seed=seed, cache_dir=cache_dir, cache_size=cache_size,
+                                        telemetry=telemetry)
+    # Create the figures:
+    if render:
+        render_results(depths, lithologies, layout, res, n, filepath, result1, result2, result3,
+                       workers=render_workers, fmt=fmt, dpi=dpi, telemetry=telemetry)
     return result1, result2, result3
@@ -1,3 +1,4 @@
+from functools import lru_cache
 import numpy as np
 
 
@@ -35,3 +36,92 @@ def markov_order(tp_matrix):
     # Compute the Markov order:
     m = argmax - argmin
     return m
+
+
+# lower_index, upper_index = diagonal_tables(F):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## F: int; the number of facies classes.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## lower_index: integer array with shape (F-1, F); row j-1 holds the flattened cell indices of the j-th offset
+##              diagonal, in the order in which markov_order() visits them. Padded with index F*F.
+## upper_index: integer array with shape (F-1, F); row j-1 holds the flattened cell indices of the -(F-j)th offset
+##              diagonal, in the order in which markov_order() visits them. Padded with index F*F.
+
+
+@lru_cache(maxsize=None)
+def diagonal_tables(F: int):
+    lower_index = np.full((F-1, F), F*F, dtype=np.intp)
+    upper_index = np.full((F-1, F), F*F, dtype=np.intp)
+    for j in range(1, F):
+        ## The j-th offset diagonal:
+        for i in range(F-j):
+            lower_index[j-1, i] = (F-(i+1))*F + (j+i)
+        ## The -(F-j)th offset diagonal:
+        for i in range(j):
+            upper_index[j-1, i] = ((j-1)-i)*F + i
+    lower_index.flags.writeable = False
+    upper_index.flags.writeable = False
+    return lower_index, upper_index
+
+
+# diag_sums = diagonal_pair_sums(tp_stack):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## tp_stack: array with shape (P, F, F) containing P transition probability matrices.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## diag_sums: array with shape (P, F-1); diag_sums[p, j-1] is the sum of the (j=j, j=-F+j) diagonal pair of the p-th
+##            matrix. Summed in the same order as markov_order(), so results are bit-identical.
+
+
+def diagonal_pair_sums(tp_stack: np.ndarray) -> np.ndarray:
+    P, F = tp_stack.shape[0], tp_stack.shape[1]
+    lower_index, upper_index = diagonal_tables(F)
+    # Flatten the matrices and append a zero cell for the padded table entries:
+    flat = np.zeros((P, F*F + 1))
+    flat[:, :F*F] = tp_stack.reshape(P, F*F)
+    # Accumulate both diagonals of every pair position by position, for all matrices at once:
+    heap_1 = np.zeros((P, F-1))
+    heap_2 = np.zeros((P, F-1))
+    for i in range(F):
+        heap_1 += flat[:, lower_index[:, i]]
+        heap_2 += flat[:, upper_index[:, i]]
+    return heap_1 + heap_2
+
+
+# m = order_from_sums(diag_sums):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## diag_sums: array with shape (P, F-1), as obtained from diagonal_pair_sums().
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## m: array of length P containing the Markov order of every matrix.
+
+
+def order_from_sums(diag_sums: np.ndarray) -> np.ndarray:
+    F = diag_sums.shape[1] + 1
+    argmin_max = diag_sums / F
+    return np.max(argmin_max, axis=1) - np.min(argmin_max, axis=1)
+
+
+# m = markov_order_batch(tp_stack):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## tp_stack: array with shape (P, F, F) containing P transition probability matrices.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## m: array of length P containing the Markov order of every matrix; identical to calling markov_order() on each.
+
+
+def markov_order_batch(tp_stack: np.ndarray) -> np.ndarray:
+    return order_from_sums(diagonal_pair_sums(tp_stack))
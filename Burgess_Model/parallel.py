@@ -0,0 +1,111 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import permutations
+import numpy as np
+# Custom imports:
+import tpmat as tp
+import markovmetric as mo
+
+# The transition probabilities of the profile being searched, set once per worker process by init_worker():
+worker_probabilities = None
+
+
+# prefixes = prefix_shards(F, depth):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## F: int; the number of facies classes.
+## depth: int; the number of leading codes that is fixed per shard.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## prefixes: a list of tuples of length 'depth'; every possible combination of leading codes, in permutation order.
+
+
+def prefix_shards(F: int, depth: int) -> list:
+    return list(permutations(range(F), depth))
+
+
+# numberings = shard_numberings(F, prefix):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## F: int; the number of facies classes.
+## prefix: tuple containing the fixed leading codes of the shard.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## numberings: integer array with shape ((F-len(prefix))!, F) containing every numbering that starts with 'prefix',
+##             in the order in which itertools.permutations(range(F)) produces them.
+
+
+def shard_numberings(F: int, prefix: tuple) -> np.ndarray:
+    remaining = [code for code in range(F) if code not in prefix]
+    numberings = [prefix + rest for rest in permutations(remaining)]
+    return np.asarray(numberings, dtype=np.intp).reshape(-1, F)
+
+
+# init_worker(probabilities):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## probabilities: array with shape (F, F), as obtained from tpmat.count_probabilities().
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## Stores 'probabilities' in the worker process, so that it is shipped once per worker instead of once per shard.
+
+
+def init_worker(probabilities: np.ndarray) -> None:
+    global worker_probabilities
+    worker_probabilities = probabilities
+
+
+# m = evaluate_shard(prefix):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## prefix: tuple containing the fixed leading codes of the shard.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## m: array containing the Markov order metric of every numbering in the shard, in permutation order.
+
+
+def evaluate_shard(prefix: tuple) -> np.ndarray:
+    F = len(worker_probabilities)
+    numberings = shard_numberings(F, prefix)
+    return mo.markov_order_batch(tp.tp_stack_from_counts(worker_probabilities, numberings))
+
+
+# m = parallel_search(probabilities, workers=None, depth=None):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## probabilities: array with shape (F, F), as obtained from tpmat.count_probabilities().
+## workers [optional]: int; the number of worker processes. Default = None (one per CPU core).
+## depth [optional]: int; the number of leading codes fixed per shard. Default = None, in which case the smallest
+##                   depth giving at least four shards per worker is used.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## m: array of length F! containing the Markov order metric of every numbering, in the order in which
+##    itertools.permutations(range(F)) produces them; identical, value for value, to the serial search.
+
+
+def parallel_search(probabilities: np.ndarray, workers: int = None, depth: int = None) -> np.ndarray:
+    F = len(probabilities)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    # Choose the shard depth; more shards than workers keeps the pool busy until the end:
+    if depth is None:
+        depth = 1
+        while depth < F - 1 and len(prefix_shards(F, depth)) < 4 * workers:
+            depth += 1
+    depth = min(depth, F)
+    prefixes = prefix_shards(F, depth)
+
+    # Evaluate the shards in the pool; map() returns them in submission order, so the merge is deterministic:
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(probabilities,)) as executor:
+        m = list(executor.map(evaluate_shard, prefixes, chunksize=max(1, len(prefixes) // (4 * workers))))
+    return np.concatenate(m)
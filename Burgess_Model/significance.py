@@ -0,0 +1,170 @@
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+# Custom imports:
+from Numerical_Tools import faciesseq as fs
+import symmetry as sym
+
+
+# The maximum number of transition probabilities gathered at once in maximum_orders(); bounds its working memory:
+GATHER_SIZE = 2 ** 22
+
+
+# tables = offset_tables(F, chunk=2048):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## F: int; the number of facies classes.
+## chunk [optional]: int; the number of numberings per table. Default = 2048.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## tables: tuple of read-only integer arrays with shape (K, F-1, F), one per chunk of K symmetry class
+##         representatives (see symmetry.py), in the smallest integer type that holds F*F - 1. Entry [k, j-1, a] is
+##         the flattened index a*F + b of the transition from class a that lands on the (j=j, j=-F+j) diagonal pair
+##         under the k-th numbering, so that summing the flattened transition probabilities at these indices over the
+##         last axis gives the diagonal pair sums of every numbering at once. Only the tables of the most recently
+##         used values of F are kept.
+
+
+@lru_cache(maxsize=4)
+def offset_tables(F: int, chunk: int = 2048) -> tuple:
+    numberings = sym.canonical_numberings(F)
+    dtype = np.min_scalar_type(max(F * F - 1, 0))
+    tables = []
+    for start in range(0, len(numberings), chunk):
+        codes = numberings[start:start + chunk]
+        K = len(codes)
+        ## classes[k, i] = the class numbered i under the k-th numbering:
+        classes = np.argsort(codes, axis=1)
+        ## The transition from a lands on pair j if it goes to the class numbered (p[a] + j) mod F, see the note in
+        ## branchbound.py; self-transitions (j=0) do not enter the metric:
+        targets = classes[np.arange(K)[:, None, None], (codes[:, None, :] + np.arange(1, F)[None, :, None]) % F]
+        table = (np.arange(F)[None, None, :] * F + targets).astype(dtype)
+        table.flags.writeable = False
+        tables.append(table)
+    return tuple(tables)
+
+
+# probabilities = code_probabilities(codes, F, merge=False):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## codes: integer array with shape (S, N) containing S integer-coded lithology sequences (indices into 'classes').
+## F: int; the number of facies classes.
+## merge [optional]: if True, transitions between beds of the same class are not counted, as if such beds were
+##                   merged into one unit. Default = False (all transitions are counted, as in
+##                   tpmat.transition_counts()).
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## probabilities: array with shape (S, F*F) containing the flattened transition probabilities of every sequence, in
+##                similar fashion to tpmat.count_probabilities(). All transitions are counted with one bincount.
+
+
+def code_probabilities(codes: np.ndarray, F: int, merge: bool = False) -> np.ndarray:
+    S = len(codes)
+    pairs = codes[:, :-1] * F + codes[:, 1:] + (np.arange(S) * F * F)[:, None]
+    counts = np.bincount(pairs.ravel(), minlength=S * F * F).reshape(S, F, F)
+    if merge:
+        counts[:, np.arange(F), np.arange(F)] = 0
+    totals = counts.sum(axis=2)
+    return (counts / np.maximum(totals, 1)[:, :, None]).reshape(S, F * F)
+
+
+# m_max = maximum_orders(probabilities, F):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## probabilities: array with shape (S, F*F), as obtained from code_probabilities().
+## F: int; the number of facies classes.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## m_max: array of length S containing, per sequence, the highest Markov order metric over all numberings. Equal to
+##        the m_max of main.compute() up to rounding in the last digit.
+
+
+def maximum_orders(probabilities: np.ndarray, F: int) -> np.ndarray:
+    m_max = np.zeros(len(probabilities))
+    for table in offset_tables(F):
+        ## Gather the probabilities of at most GATHER_SIZE pairs at once, a few sequences at a time:
+        step = max(GATHER_SIZE // table.size, 1)
+        for start in range(0, len(probabilities), step):
+            sums = probabilities[start:start + step, table].sum(axis=3)
+            m = np.max(np.max(sums, axis=2) - np.min(sums, axis=2), axis=1) / F
+            m_max[start:start + step] = np.maximum(m_max[start:start + step], m)
+    return m_max
+
+
+# m_max = shuffle_block(codes, F, shuffles, seed_sequence, merge=False):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## codes: integer array of length N containing the integer-coded lithology sequence of the log.
+## F: int; the number of facies classes.
+## shuffles: int; the number of shuffled sequences in the block.
+## seed_sequence: numpy.random.SeedSequence of the block's own random number stream.
+## merge [optional]: see code_probabilities(). Default = False.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## m_max: array of length 'shuffles' containing the maximum Markov order metric of every shuffled sequence.
+
+
+def shuffle_block(codes: np.ndarray, F: int, shuffles: int, seed_sequence: np.random.SeedSequence,
+                  merge: bool = False) -> np.ndarray:
+    rng = np.random.default_rng(seed_sequence)
+    shuffled = rng.permuted(np.tile(codes, (shuffles, 1)), axis=1)
+    return maximum_orders(code_probabilities(shuffled, F, merge=merge), F)
+
+
+# m_max, null, p_value = shuffle_test(lithologies, classes, shuffles=1000, seed=None, workers=None, merge=False,
+#                                     block=250):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## lithologies: a list containing the lithologies, as strings, of the profile. Length (N).
+## classes: a list of all unique facies classes, size F.
+## shuffles [optional]: int; the number of random stackings of the same beds that make up the null distribution.
+##                      Default = 1000.
+## seed [optional]: seed of the random number generator. Default = None.
+## workers [optional]: int; the number of worker processes. Default = None (computed in the current process).
+## merge [optional]: if True, adjacent beds of the same class count as one unit, like they do in logs read with
+##                   synthtools.flagged_reader(); in the shuffled sequences as well as in the log itself. 'm_max' then
+##                   differs from the m_max of main.compute() if the log holds adjacent beds of the same class.
+##                   Default = False (all transitions are counted, as in main.compute()).
+## block [optional]: int; the number of shuffles per block. Every block draws from its own random number stream,
+##                   spawned from 'seed', so the result does not depend on 'workers'. Default = 250.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## m_max: the maximum Markov order metric of the log itself; with merge=False, the m_max of main.compute() up to
+##        rounding in the last digit.
+## null: array of length 'shuffles' containing the maximum Markov order metric of every shuffled sequence.
+## p_value: the probability of a random stacking of the same beds reaching at least 'm_max',
+##          (1 + #(null >= m_max)) / (1 + shuffles).
+
+
+def shuffle_test(lithologies: list, classes: list, shuffles: int = 1000, seed: int = None, workers: int = None,
+                 merge: bool = False, block: int = 250):
+    F = len(classes)
+    codes = fs.facies_codes(lithologies, classes)
+    # The log itself, evaluated in the same way as the shuffles; with 'merge', runs of the same class are one unit:
+    observed = codes
+    if merge:
+        observed = codes[np.r_[True, codes[1:] != codes[:-1]]]
+    m_max = maximum_orders(code_probabilities(observed[None, :], F), F)[0]
+
+    # Divide the shuffles into blocks with independent random number streams:
+    sizes = [min(block, shuffles - start) for start in range(0, shuffles, block)]
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(sizes))
+    if workers is None:
+        null = [shuffle_block(codes, F, sizes[i], seed_sequences[i], merge) for i in range(len(sizes))]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            null = list(executor.map(shuffle_block, [codes] * len(sizes), [F] * len(sizes), sizes, seed_sequences,
+                                     [merge] * len(sizes)))
+    null = np.concatenate(null) if len(null) > 0 else np.zeros(0)
+    p_value = (1 + np.sum(null >= m_max)) / (1 + shuffles)
+    return m_max, null, p_value
@@ -0,0 +1,97 @@
+import heapq
+from itertools import islice, permutations
+import numpy as np
+# Custom imports:
+import tpmat as tp
+import markovmetric as mo
+import symmetry as sym
+
+
+# start, numberings = numbering_chunks(F, chunk, symmetric=False):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## F: int; the number of facies classes.
+## chunk: int; the maximum number of numberings per chunk.
+## symmetric [optional]: if True, only one representative per symmetry class is produced (see symmetry.py).
+##                       Default = False.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## A generator yielding, in order of itertools.permutations(range(F)):
+## start: int; the index of the first numbering of the chunk.
+## numberings: integer array with shape (<=chunk, F) containing the numberings of the chunk.
+
+
+def numbering_chunks(F: int, chunk: int, symmetric: bool = False):
+    if symmetric:
+        representatives = sym.canonical_numberings(F)
+        for start in range(0, len(representatives), chunk):
+            yield start, representatives[start:start + chunk]
+        return
+    ## Draw the numberings from the permutation iterator, so that they never exist all at once:
+    numbering_iterator = permutations(range(F))
+    start = 0
+    while True:
+        numberings = np.asarray(list(islice(numbering_iterator, chunk)), dtype=np.intp).reshape(-1, F)
+        if len(numberings) == 0:
+            return
+        yield start, numberings
+        start += len(numberings)
+
+
+# numberings, m, hist_counts, hist_edges = stream_search(probabilities, top_k=None, threshold=None, symmetric=False,
+#                                                         chunk=5040, resolution=2400):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## probabilities: array with shape (F, F), as obtained from tpmat.count_probabilities().
+## top_k [optional]: int; keep only the 'top_k' numberings with the highest m-values. Ties are resolved in favour of
+##                   the numbering that comes first in the permutation order. Default = None.
+## threshold [optional]: float; keep only the numberings with m >= 'threshold'. Default = None.
+##                       At least one of 'top_k' and 'threshold' must be given; if both are, the top_k numberings
+##                       with m >= threshold are kept.
+## symmetric [optional]: if True, only one representative per symmetry class is evaluated. Default = False.
+## chunk [optional]: int; the number of numberings evaluated per batch. Default = 5040.
+## resolution [optional]: int; the number of bins of the online histogram on [0, 1]. Default = 2400.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## numberings: integer array with shape (K, F) containing the kept numberings, in permutation order.
+## m: array of length K containing their Markov order metrics; bit-identical to markovmetric.markov_order().
+## hist_counts: integer array of length 'resolution' containing the number of evaluated numberings per bin.
+## hist_edges: array of length 'resolution' + 1 containing the bin edges of 'hist_counts'.
+
+
+def stream_search(probabilities: np.ndarray, top_k: int = None, threshold: float = None, symmetric: bool = False,
+                  chunk: int = 5040, resolution: int = 2400):
+    if top_k is None and threshold is None:
+        raise ValueError('stream_search needs top_k, threshold or both; otherwise every numbering is kept.')
+    F = len(probabilities)
+    # The Markov order metric always lies within [0, 1], so the histogram bins can be fixed in advance:
+    hist_edges = np.linspace(0, 1, resolution + 1)
+    hist_counts = np.zeros(resolution, dtype=np.int64)
+    # Bounded min-heap of (m, -index, numbering); heap[0] is the weakest numbering kept so far:
+    heap = []
+    for start, numberings in numbering_chunks(F, chunk, symmetric=symmetric):
+        m = mo.markov_order_batch(tp.tp_stack_from_counts(probabilities, numberings))
+        ## Update the histogram online:
+        hist_counts += np.histogram(m, bins=hist_edges)[0]
+        ## Select the candidates of this chunk before touching the heap:
+        candidates = np.arange(len(m))
+        if threshold is not None:
+            candidates = candidates[m >= threshold]
+        if top_k is not None and len(candidates) > top_k:
+            candidates = candidates[np.argsort(-m[candidates], kind='stable')[:top_k]]
+        for i in candidates:
+            entry = (m[i], -(start + i), tuple(numberings[i].tolist()))
+            if top_k is None or len(heap) < top_k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+    # Return the kept numberings in permutation order:
+    heap.sort(key=lambda entry: -entry[1])
+    numberings = np.asarray([entry[2] for entry in heap], dtype=np.intp).reshape(-1, F)
+    m = np.asarray([entry[0] for entry in heap])
+    return numberings, m, hist_counts, hist_edges
@@ -0,0 +1,132 @@
+from functools import lru_cache
+from itertools import permutations
+import numpy as np
+# Custom imports:
+import tpmat as tp
+import markovmetric as mo
+
+
+# A short note on the symmetries used here:
+# ======================================================================================================================
+## A transition from class a to class b lands on the (j=j, j=-F+j) diagonal pair with j = (p[b] - p[a]) mod F, where p
+## is the numbering. Shifting every code by the same amount (p + k mod F) keeps all offsets, and reversing the
+## numbering (F-1 - p) maps offset j onto F-j. Neither changes the set of diagonal pair sums, so both leave the Markov
+## order metric and the outcome of diagsift.diagonal_sifter() unchanged. Together they group the F! numberings into
+## classes of 2F members (for F >= 3), of which only one representative needs to be evaluated. Floating point sums
+## may differ in the last digit between members of a class, which is why every expansion below recomputes the metric.
+# ======================================================================================================================
+
+
+# members = symmetry_class(numberings):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## numberings: integer array with shape (K, F) containing K numberings in order of 'classes'.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## members: integer array with shape (K, 2F, F); members[k] holds every code shift of numberings[k] and of its
+##          reversal.
+
+
+def symmetry_class(numberings: np.ndarray) -> np.ndarray:
+    F = numberings.shape[1]
+    shifts = np.arange(F)[None, :, None]
+    shifted = (numberings[:, None, :] + shifts) % F
+    reversed_shifted = ((F - 1) - numberings[:, None, :] + shifts) % F
+    return np.concatenate((shifted, reversed_shifted), axis=1)
+
+
+# numberings = all_numberings(F):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## F: int; the number of facies classes.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## numberings: read-only integer array with shape (F!, F) containing every numbering, in the order in which
+##             itertools.permutations(range(F)) produces them. The table is built once per F and process and is
+##             shared by every profile with F facies classes.
+
+
+@lru_cache(maxsize=None)
+def all_numberings(F: int) -> np.ndarray:
+    numberings = np.asarray(list(permutations(range(F))), dtype=np.intp).reshape(-1, F)
+    numberings.flags.writeable = False
+    return numberings
+
+
+# numberings = canonical_numberings(F):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## F: int; the number of facies classes.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## numberings: read-only integer array with shape (F!/(2F), F) containing one representative of every symmetry class:
+##             the numbering that assigns code 0 to classes[0] and is lexicographically smaller than its own
+##             (shifted) reversal. For F < 3 all F! numberings are returned.
+
+
+@lru_cache(maxsize=None)
+def canonical_numberings(F: int) -> np.ndarray:
+    if F < 3:
+        return all_numberings(F)
+    numberings = [(0,) + rest for rest in permutations(range(1, F))]
+    numberings = np.asarray(numberings, dtype=np.intp)
+    ## The reversal that keeps classes[0] at code 0 is -p mod F:
+    mirrored = (-numberings) % F
+    first_difference = np.argmax(numberings != mirrored, axis=1)
+    rows = np.arange(len(numberings))
+    numberings = numberings[numberings[rows, first_difference] < mirrored[rows, first_difference]]
+    numberings.flags.writeable = False
+    return numberings
+
+
+# numberings, m = expand_numberings(probabilities, numberings):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## probabilities: array with shape (F, F), as obtained from tpmat.count_probabilities().
+## numberings: integer array with shape (K, F) containing representatives of K symmetry classes.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## numberings: integer array containing every member of the given symmetry classes, without duplicates and in the
+##             order in which itertools.permutations(range(F)) produces them.
+## m: array containing their Markov order metrics, recomputed per member so that they are bit-identical to
+##    markovmetric.markov_order().
+
+
+def expand_numberings(probabilities: np.ndarray, numberings: np.ndarray):
+    F = numberings.shape[1]
+    members = symmetry_class(numberings).reshape(-1, F)
+    members = np.unique(members, axis=0)
+    m = mo.markov_order_batch(tp.tp_stack_from_counts(probabilities, members))
+    return members, m
+
+
+# numberings, m = expand_maxima(probabilities, numberings, m, tolerance=1e-9):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## probabilities: array with shape (F, F), as obtained from tpmat.count_probabilities().
+## numberings: integer array with shape (K, F) containing representatives of K symmetry classes.
+## m: array of length K containing the Markov order metrics of the representatives.
+## tolerance [optional]: classes whose representative falls short of the maximum by no more than 'tolerance' are
+##                       expanded, so that members which only differ by rounding are never lost. Default = 1e-9.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## numberings: integer array containing every numbering with the maximum Markov order metric, in the order in which
+##             itertools.permutations(range(F)) produces them; identical to the exhaustive search.
+## m: array containing their Markov order metrics (all equal to m_max).
+
+
+def expand_maxima(probabilities: np.ndarray, numberings: np.ndarray, m: np.ndarray, tolerance: float = 1e-9):
+    candidates = numberings[m >= np.max(m) - tolerance]
+    members, members_m = expand_numberings(probabilities, candidates)
+    m_max = np.max(members_m)
+    return members[members_m == m_max], members_m[members_m == m_max]
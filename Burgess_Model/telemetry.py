@@ -0,0 +1,162 @@
+import sys
+import json
+import tracemalloc
+from time import perf_counter
+from contextlib import contextmanager, nullcontext
+
+
+# progress_bar(done, total):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## done: the number of completed items.
+## total: the total number of items.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## Redraws the progress bar on the current line of the console.
+
+
+def progress_bar(done: int, total: int) -> None:
+    sys.stdout.write('\r')
+    j = done / max(total, 1)
+    sys.stdout.write("[%-20s] %d%%" % ('=' * int(20 * j), 100 * j))
+    sys.stdout.flush()
+
+
+# print_event(event):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## event: a dictionary as passed to the callback of a Telemetry object.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## A callback that draws the progress bar for 'progress' events and prints a summary line at the end of every stage.
+
+
+def print_event(event: dict) -> None:
+    if event['event'] == 'progress':
+        progress_bar(event['done'], event['total'])
+    elif event['event'] == 'end':
+        line = '\n' + event['stage'] + ': ' + str(round(event['seconds'], 3)) + ' s'
+        if event.get('rate') is not None:
+            line += ', ' + str(round(event['rate'], 1)) + ' ' + event['unit'] + '/s'
+        if event.get('peak_bytes') is not None:
+            line += ', peak ' + str(round(event['peak_bytes'] / 2 ** 20, 2)) + ' MB'
+        print(line)
+
+
+# telemetry = Telemetry(callback=None, memory=False):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## callback [optional]: a function called with an event dictionary whenever a stage starts ('event': 'start'), makes
+##                      progress ('event': 'progress', with 'done' and 'total') or ends ('event': 'end', with the
+##                      stage record). Default = None (nothing is printed); see print_event().
+## memory [optional]: if True, the peak memory of every stage is traced with tracemalloc, which slows the stages
+##                    down. Only the current process is traced, not the worker processes. Default = False.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## telemetry: a recorder to pass as 'telemetry' to main.main(), main.compute() or main.render_results(). Every stage
+##            of the pipeline (search, sift, profile, histogram, candidates, ideal sequences) adds a record to
+##            telemetry.stages with:
+##      stage: the name of the stage.
+##      seconds: the wall-clock time of the stage, including the writing of its figures. [s]
+##      items, unit: the number of items processed in the stage and what they are (numberings or figures), if known.
+##      rate: items per second.
+##      peak_bytes: the peak memory allocated during the stage, if 'memory' is True. [bytes]
+## Runs without a Telemetry object are not instrumented at all.
+
+
+class Telemetry:
+    def __init__(self, callback=None, memory: bool = False):
+        self.callback = callback
+        self.memory = memory
+        self.stages = []
+
+    # with telemetry.stage(name, items=None, unit='numberings') as record:
+    ## Records the stage run within the block; the block may set record['items'] once the count is known.
+    @contextmanager
+    def stage(self, name: str, items: int = None, unit: str = 'numberings'):
+        record = {'stage': name, 'items': items, 'unit': unit}
+        self.emit({'event': 'start', 'stage': name})
+        started_tracing = self.memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        elif self.memory:
+            tracemalloc.reset_peak()
+        start = perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = perf_counter() - start
+            record['rate'] = None
+            if record['items'] is not None and record['seconds'] > 0:
+                record['rate'] = record['items'] / record['seconds']
+            record['peak_bytes'] = None
+            if self.memory:
+                record['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+                if started_tracing:
+                    tracemalloc.stop()
+            self.stages.append(record)
+            self.emit(dict(record, event='end'))
+
+    # telemetry.progress(name, done, total):
+    ## Reports that 'done' out of 'total' items of stage 'name' are completed.
+    def progress(self, name: str, done: int, total: int) -> None:
+        self.emit({'event': 'progress', 'stage': name, 'done': done, 'total': total})
+
+    def emit(self, event: dict) -> None:
+        if self.callback is not None:
+            self.callback(event)
+
+    # report = telemetry.report():
+    ## report: a dictionary containing the stage records under 'stages' and their total duration under 'seconds'.
+    def report(self) -> dict:
+        return {'stages': [dict(record) for record in self.stages],
+                'seconds': sum(record['seconds'] for record in self.stages)}
+
+    # telemetry.save(path):
+    ## Writes report() to 'path' as JSON.
+    def save(self, path: str) -> None:
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=1)
+
+
+# with stage(telemetry, name, items=None, unit='numberings') as record:
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## telemetry: a Telemetry object, or None.
+## name, items, unit: see Telemetry.stage().
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## The stage context of 'telemetry', or a context that does nothing if 'telemetry' is None.
+
+
+def stage(telemetry: Telemetry, name: str, items: int = None, unit: str = 'numberings'):
+    if telemetry is None:
+        return nullcontext(dict())
+    return telemetry.stage(name, items=items, unit=unit)
+
+
+# callback = progress_callback(telemetry, name):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## telemetry: a Telemetry object, or None.
+## name: the name of the stage.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## callback: a function callback(done, total) that reports progress of stage 'name' to 'telemetry', or
+##           progress_bar() if 'telemetry' is None.
+
+
+def progress_callback(telemetry: Telemetry, name: str):
+    if telemetry is None:
+        return progress_bar
+    return lambda done, total: telemetry.progress(name, done, total)
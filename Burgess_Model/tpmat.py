@@ -1,4 +1,6 @@
 import numpy as np
+# Custom imports:
+from Numerical_Tools import faciesseq as fs
 
 
 # facies__tp_mat = tp_matrix(depths, lithologies, classes, numbering):
@@ -6,7 +8,7 @@ import numpy as np
 # INPUT:
 # ======================================================================================================================
 ## lithologies: a list of size N, containing the lithologies, as strings, corresponding to the
-##              boundaries defined in depths.
+##              boundaries defined in depths; or a faciesseq.FaciesSequence.
 ## classes: a list of all unique facies classes, size F.
 ## numbering: a list of size F, containing the numbers assigned to each facies class, in order of 'classes'.
 # ======================================================================================================================
@@ -25,9 +27,7 @@ def tp_matrix(lithologies: list, classes: list, numbering: tuple):
     for i in range(F):
         facies_coding_dict[classes[i]] = numbering[i]
     # Create a list of facies codes according to the given numbering:
-    codes = []
-    for i in range(N):
-        codes.append(facies_coding_dict[lithologies[i]])
+    codes = np.asarray(numbering)[fs.facies_codes(lithologies, classes)].tolist()
     # Construct the TP matrix:
     tp_mat = np.zeros((F, F))
     # Count transitions for every cell in the matrix:
@@ -51,3 +51,92 @@ def tp_matrix(lithologies: list, classes: list, numbering: tuple):
                 lith_count += 1
             tp_mat[i, j] = tp_mat[i, j] / lith_count
     return facies_coding_dict, tp_mat
+
+
+# counts, totals = transition_counts(lithologies, classes):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## lithologies: a list of size N, containing the lithologies, as strings, corresponding to the
+##              boundaries defined in depths; or a faciesseq.FaciesSequence.
+## classes: a list of all unique facies classes, size F.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## counts: array with shape (F, F); counts[a, b] is the number of upward transitions from classes[a] to classes[b].
+## totals: array of length F; totals[a] is the number of occurrences of classes[a] in lithologies[:-1] (row totals).
+
+
+def transition_counts(lithologies: list, classes: list):
+    # Number of classes F:
+    F = len(classes)
+    # Integer-code the profile once, using the index of each lithology in 'classes':
+    codes = fs.facies_codes(lithologies, classes)
+    # Count all transitions in a single pass over the coded profile:
+    counts = np.bincount(codes[:-1] * F + codes[1:], minlength=F * F).reshape(F, F)
+    totals = counts.sum(axis=1)
+    return counts, totals
+
+
+# probabilities = count_probabilities(counts, totals):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## counts: array with shape (F, F), as obtained from transition_counts().
+## totals: array of length F, as obtained from transition_counts().
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## probabilities: array with shape (F, F) containing the transition probabilities in order of 'classes'. Rows of
+##                classes that never transition upward (unique facies class at the top of the profile) are
+##                divided by 1, in similar fashion to tp_matrix().
+
+
+def count_probabilities(counts: np.ndarray, totals: np.ndarray) -> np.ndarray:
+    return counts / np.maximum(totals, 1)[:, None]
+
+
+# facies_dict, tp_mat = tp_from_counts(probabilities, classes, numbering):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## probabilities: array with shape (F, F), as obtained from count_probabilities().
+## classes: a list of all unique facies classes, size F.
+## numbering: a list of size F, containing the numbers assigned to each facies class, in order of 'classes'.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## facies_coding_dict: a dictionary with as key:value pairs 'lithology:code'.
+## tp_matrix: a transition probability matrix, with row/col ordering according to assigned numbering of classes.
+##            Identical to the output of tp_matrix() for the same profile and numbering.
+
+
+def tp_from_counts(probabilities: np.ndarray, classes: list, numbering: tuple):
+    # Number of classes F:
+    F = len(classes)
+    # Create a dictionary with facies classes as keys, and numbering as associated values:
+    facies_coding_dict = dict()
+    for i in range(F):
+        facies_coding_dict[classes[i]] = numbering[i]
+    # Find the class carrying each code; row i holds code F-(i+1), column j holds code j:
+    class_of_code = np.argsort(numbering)
+    tp_mat = probabilities[class_of_code[::-1][:, None], class_of_code[None, :]]
+    return facies_coding_dict, tp_mat
+
+
+# tp_stack = tp_stack_from_counts(probabilities, numberings):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## probabilities: array with shape (F, F), as obtained from count_probabilities().
+## numberings: integer array with shape (P, F), containing P numberings in order of 'classes'.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## tp_stack: array with shape (P, F, F) containing the TP matrix of every numbering, identical to tp_matrix().
+
+
+def tp_stack_from_counts(probabilities: np.ndarray, numberings: np.ndarray) -> np.ndarray:
+    # Find for every numbering the class carrying each code:
+    class_of_code = np.argsort(numberings, axis=1)
+    return probabilities[class_of_code[:, ::-1, None], class_of_code[:, None, :]]
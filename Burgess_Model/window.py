@@ -0,0 +1,80 @@
+import numpy as np
+# Custom imports:
+from Numerical_Tools import faciesseq as fs
+import markovmetric as mo
+import significance as sg
+
+
+# cumulative = cumulative_counts(lithologies, classes):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## lithologies: a list containing the lithologies, as strings, of the profile. Length (N).
+## classes: a list of all unique facies classes, size F.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## cumulative: integer array with shape (N, F, F); cumulative[k] holds the transition counts of the first k
+##             transitions (lithologies[i] to lithologies[i+1] for i < k), in similar fashion to
+##             tpmat.transition_counts(). The counts of transitions k0 up to k1 are cumulative[k1] - cumulative[k0].
+
+
+def cumulative_counts(lithologies: list, classes: list) -> np.ndarray:
+    F = len(classes)
+    codes = fs.facies_codes(lithologies, classes)
+    # One-hot encode every transition and sum cumulatively along the profile:
+    cumulative = np.zeros((max(len(codes), 1), F * F), dtype=np.int64)
+    cumulative[np.arange(1, len(codes)), codes[:-1] * F + codes[1:]] = 1
+    return np.cumsum(cumulative, axis=0).reshape(-1, F, F)
+
+
+# centers, m, transitions = window_profile(depths, lithologies, classes, window, step=None, facies_dict=None):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## depths: a list containing the depths (in meters) at which lithology boundaries occur of length (N + 1).
+## lithologies: a list containing the lithologies, as strings, corresponding to the lithological units
+##              defined by the boundaries in 'depths'. Length (N).
+## classes: a list of all unique facies classes, size F.
+## window: float; the length of the moving window. [m]
+## step [optional]: float; the distance between consecutive windows. Default = None (window / 10). [m]
+## facies_dict [optional]: a dictionary with as key:value pairs 'lithology:code'; if given, m is computed for this
+##                         numbering in every window (e.g. result2[i][2] of main.compute()). Default = None, in which
+##                         case m is the highest metric over all numberings per window.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## centers: array containing the center depth of every window. [m]
+## m: array containing the Markov order metric of every window. A transition counts towards a window if the
+##    boundary at which it occurs (depths[1:-1]) lies within the window.
+## transitions: integer array containing the number of transitions per window; windows with few transitions give
+##              unreliable metrics.
+
+
+def window_profile(depths: list, lithologies: list, classes: list, window: float, step: float = None,
+                   facies_dict: dict = None):
+    F = len(classes)
+    depths = np.asarray(depths, dtype=float)
+    if step is None:
+        step = window / 10
+    cumulative = cumulative_counts(lithologies, classes).reshape(-1, F * F)
+
+    # The window edges and the range of transitions (boundaries) within each window:
+    starts = np.arange(depths[0], max(depths[-1] - window, depths[0]) + step / 2, step)
+    boundaries = depths[1:-1]
+    first = np.searchsorted(boundaries, starts, side='left')
+    last = np.searchsorted(boundaries, starts + window, side='left')
+
+    # Transition counts per window from a single subtraction of the cumulative counts:
+    counts = (cumulative[last] - cumulative[first]).reshape(-1, F, F)
+    totals = counts.sum(axis=2)
+    probabilities = counts / np.maximum(totals, 1)[:, :, None]
+
+    if facies_dict is None:
+        m = sg.maximum_orders(probabilities.reshape(-1, F * F), F)
+    else:
+        ## Reorder every window's probabilities into a TP matrix of the given numbering, see tpmat.tp_from_counts():
+        class_of_code = np.argsort([facies_dict[c] for c in classes])
+        tp_stack = probabilities[:, class_of_code[::-1][:, None], class_of_code[None, :]]
+        m = mo.markov_order_batch(tp_stack)
+    return starts + window / 2, m, totals.sum(axis=1)
@@ -0,0 +1,121 @@
+import sys
+import numpy as np
+
+
+# sequence = FaciesSequence(codes, classes):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## codes: an integer array of length N containing, per bed (or per sample), the index of its facies class in
+##        'classes'. A ValueError is raised for non-integer codes or codes outside [0, len(classes)).
+## classes: a list of all unique facies classes as strings, at most 256.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## sequence: a compact lithology sequence; the codes are stored as uint8 (one byte per bed) and the class names are
+##           interned once in a class table. It behaves like the list of lithology strings it represents: len(),
+##           iteration and indexing with an integer return the class names, so it can be passed wherever a list
+##           of lithologies is expected. Slicing returns a FaciesSequence. The numerical code paths (see
+##           facies_codes()) use the integer codes directly and never look up strings.
+
+
+class FaciesSequence:
+    def __init__(self, codes, classes):
+        self.classes = tuple(sys.intern(str(c)) for c in classes)
+        if len(self.classes) > 256:
+            raise ValueError('FaciesSequence holds at most 256 facies classes, not ' + str(len(self.classes)) + '.')
+        codes = np.asarray(codes)
+        # Refuse codes that the conversion to uint8 would truncate (floats) or wrap around (out of range):
+        if codes.size > 0 and not np.issubdtype(codes.dtype, np.integer):
+            raise ValueError('FaciesSequence codes must be integers, not ' + str(codes.dtype) + '.')
+        if codes.size > 0 and (codes.min() < 0 or codes.max() >= len(self.classes)):
+            raise ValueError('FaciesSequence codes must lie within [0, ' + str(len(self.classes)) + ').')
+        self.codes = codes.astype(np.uint8).ravel()
+
+    # sequence = FaciesSequence.from_lithologies(lithologies, classes=None):
+    ## lithologies: a list of lithologies as strings.
+    ## classes [optional]: the class table; Default = None (classes in order of first appearance).
+    @classmethod
+    def from_lithologies(cls, lithologies, classes: list = None):
+        if isinstance(lithologies, FaciesSequence):
+            return lithologies if classes is None else cls(lithologies.codes_in(classes), classes)
+        if classes is None:
+            classes = list(dict.fromkeys(lithologies))
+        class_index = dict()
+        for i in range(len(classes)):
+            class_index[classes[i]] = i
+        return cls(np.fromiter((class_index[lith] for lith in lithologies), dtype=np.intp, count=len(lithologies)),
+                   classes)
+
+    # sequence = FaciesSequence.from_codes(code_profile, code_dict):
+    ## code_profile: an array of integer facies codes, e.g. as read from a log.
+    ## code_dict: a dictionary containing as key:value pairs 'code:lith', with the codes as strings.
+    @classmethod
+    def from_codes(cls, code_profile, code_dict: dict):
+        keys = sorted(int(key) for key in code_dict)
+        classes = [code_dict[str(key)] for key in keys]
+        keys = np.asarray(keys, dtype=np.int64)
+        code_profile = np.asarray(code_profile).astype(np.int64)
+        index = np.minimum(np.searchsorted(keys, code_profile), len(keys) - 1)
+        if np.any(keys[index] != code_profile):
+            raise KeyError('code_profile contains codes that are not in code_dict.')
+        return cls(index, classes)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __iter__(self):
+        classes = self.classes
+        return (classes[code] for code in self.codes.tolist())
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return self.classes[self.codes[index]]
+        return FaciesSequence(self.codes[index], self.classes)
+
+    def __repr__(self) -> str:
+        return 'FaciesSequence(' + str(len(self)) + ' beds, classes=' + repr(list(self.classes)) + ')'
+
+    # lithologies = sequence.tolist():
+    ## lithologies: the list of lithology strings represented by the sequence.
+    def tolist(self) -> list:
+        return list(self)
+
+    # codes = sequence.codes_in(classes):
+    ## classes: a list of facies classes that contains every class of the sequence.
+    ## codes: integer array containing per bed the index of its class in 'classes'.
+    def codes_in(self, classes: list) -> np.ndarray:
+        classes = list(classes)
+        if tuple(classes) == self.classes:
+            return self.codes.astype(np.intp)
+        class_index = dict()
+        for i in range(len(classes)):
+            class_index[classes[i]] = i
+        lookup = np.asarray([class_index.get(c, -1) for c in self.classes], dtype=np.intp)
+        codes = lookup[self.codes]
+        if np.any(codes < 0):
+            missing = [self.classes[i] for i in np.unique(self.codes[codes < 0])]
+            raise KeyError(missing[0])
+        return codes
+
+
+# codes = facies_codes(lithologies, classes):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## lithologies: a list of lithologies as strings, or a FaciesSequence. Length (N).
+## classes: a list of all unique facies classes, size F.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## codes: integer array of length N containing per bed the index of its class in 'classes'. For a FaciesSequence
+##        this is a single table lookup; for a list of strings every lithology is looked up once.
+
+
+def facies_codes(lithologies, classes: list) -> np.ndarray:
+    if isinstance(lithologies, FaciesSequence):
+        return lithologies.codes_in(classes)
+    class_index = dict()
+    for i in range(len(classes)):
+        class_index[classes[i]] = i
+    return np.fromiter((class_index[lith] for lith in lithologies), dtype=np.intp, count=len(lithologies))
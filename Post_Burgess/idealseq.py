@@ -1,17 +1,53 @@
 from typing import Tuple
 import numpy as np
+from Numerical_Tools import faciesseq as fs
 from Synthetic_Sequencer import synthtools as syn
-from Visualization_Tools import profile_visualizers as pv
+
+
+# sequence_order = ideal_order(tp_matrix, facies_dict):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## tp_matrix: transition probability matrix from which the ideal sequence is extracted. Shape (F, F).
+## facies_dict: a dictionary with as key:value pairs 'lithology:code', corresponding to the TP matrix.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## sequence_order: list of length F, containing top-down the ideal facies order read from the (j=1,j=-(F-1)) or
+##                 (j=-1,j=F-1) diagonal pair, whichever holds the larger sum. This is the order shown in the lithology
+##                 bar of matrix_visualizers.matrix_imager(ideal=True), computed without drawing anything.
+
+
+def ideal_order(tp_matrix: np.ndarray, facies_dict: dict) -> list:
+    # Amount of facies classes F:
+    F = len(tp_matrix[0, :])
+    # The row labels of the TP matrix, top-down:
+    reverse_facies_dict = syn.reverse_dict(facies_dict)
+    sequence_order = []
+    for i in range(F):
+        sequence_order.append(reverse_facies_dict[str((F-1)-i)])
+    # Find the sum value in the (j=1,j=-F) and (j=-1,j=F) diagonal pairs:
+    diag_sum_pos = tp_matrix[0, 0]
+    diag_sum_neg = tp_matrix[F-1, F-1]
+    for i in range(F-1):
+        ## The j=1th diagonal:
+        diag_sum_pos += tp_matrix[(F-1)-i, 1+i]
+        ## The j=-1th diagonal:
+        diag_sum_neg += tp_matrix[(F-2)-i, i]
+    # If the (j=1,j=-F) diagonal has the highest sum value, reverse the order:
+    if diag_sum_pos > diag_sum_neg:
+        sequence_order.reverse()
+    return sequence_order
 
 
 # ideal_depths, sequence_order = ideal_sequencer(depths, lithologies, tp_matrix, facies_dict, sequence_order,
-#                                                layout, filepath) -> Tuple[list, list]:
+#                                                layout, proportional=False, filepath=None, render=True):
 # ======================================================================================================================
 # INPUT:
 # ======================================================================================================================
 ## depths: a list containing the depths (in meters) at which lithology boundaries occur of length (N + 1).
 ## lithologies: a list containing the lithologies, as strings, corresponding to the lithological units
-##              defined by the boundaries in 'depths'. Length (N).
+##              defined by the boundaries in 'depths'; or a faciesseq.FaciesSequence. Length (N).
 ## tp_matrix: transition probability matrix from which the ideal sequence is extracted. Shape (F, F).
 ## facies_dict: a dictionary with as key:value pairs 'lithology:code', corresponding to the TP matrix.
 ## sequence_order: list of length F, containing from bottom to top the ideal facies order as obtained from the Burgess
@@ -19,6 +55,7 @@ from Visualization_Tools import profile_visualizers as pv
 ## layout: a dictionary containing as key:value pairs 'facies class:[color, hatch]'.
 ## proportional [optional]: if True, returns parasequence proportions instead of thicknesses. Default = False.
 ## filepath [optional]: string containing the directory to which the figure is saved.
+## render [optional]: if False, the ideal sequence is computed without drawing the figure. Default = True.
 # ======================================================================================================================
 # OUTPUT:
 # ======================================================================================================================
@@ -29,8 +66,8 @@ from Visualization_Tools import profile_visualizers as pv
 
 
 def ideal_sequencer(depths: list, lithologies: list, tp_matrix: np.ndarray, facies_dict: dict,
-                    sequence_order: list, layout: dict, proportional: bool = False, filepath: str = None) -> \
-                    Tuple[list, list]:
+                    sequence_order: list, layout: dict, proportional: bool = False, filepath: str = None,
+                    render: bool = True) -> Tuple[list, list]:
 
     # Amount of facies classes F:
     F = len(tp_matrix[0, :])
@@ -39,16 +76,14 @@ def ideal_sequencer(depths: list, lithologies: list, tp_matrix: np.ndarray, faci
     thickness_mat = np.zeros_like(tp_matrix)
     count_mat = np.zeros_like(tp_matrix)
 
-    # Iterate over the vertical profile (skipping the last entry):
-    for i in range(len(lithologies)-1):
-        ## Check the current lithology to retrieve the row code:
-        row_code = facies_dict[lithologies[i]]
-        row_code = (F-1) - row_code
-        ## Check the neighbour lithology to retrieve the column code:
-        col_code = facies_dict[lithologies[i+1]]
-        ## Update the thickness and count buckets on this location:
-        thickness_mat[row_code, col_code] += depths[i+1] - depths[i]
-        count_mat[row_code, col_code] += 1
+    # Code the vertical profile according to 'facies_dict':
+    codes = np.asarray(list(facies_dict.values()))[fs.facies_codes(lithologies, list(facies_dict))]
+    ## The row code of each lithology and the column code of its neighbour (skipping the last entry):
+    row_codes = (F-1) - codes[:-1]
+    col_codes = codes[1:]
+    ## Update the thickness and count buckets on these locations, in profile order:
+    np.add.at(thickness_mat, (row_codes, col_codes), np.diff(np.asarray(depths, dtype=float))[:len(codes)-1])
+    np.add.at(count_mat, (row_codes, col_codes), 1)
 
     # Now normalize the thickness buckets by dividing each bucket by its corresponding count bucket:
     thickness_mat = thickness_mat / (count_mat + 1e-5)
@@ -77,6 +112,9 @@ def ideal_sequencer(depths: list, lithologies: list, tp_matrix: np.ndarray, faci
         ideal_depths = ideal_depths / ideal_depths[-1]
 
     # Visualize the ideal sequence:
-    pv.parasequence_profile(ideal_depths, sequence_order, layout, res=10, proportional=proportional, filepath=filepath)
+    if render:
+        from Visualization_Tools import profile_visualizers as pv
+        pv.parasequence_profile(ideal_depths, sequence_order, layout, res=10, proportional=proportional,
+                                filepath=filepath)
 
     return ideal_depths, sequence_order
@@ -1,14 +1,10 @@
 import numpy as np
-from matplotlib import pyplot as plt
-from matplotlib import patches
-from matplotlib.patches import Patch
-from scipy import stats
 # Custom imports:
 import seqreader
 
 
 # depths, lithologies = gaussian_noise(x_profile, y_profile, derivs, para_boundaries, dicts, layout, res, gamma=0,
-#                                      filepath=None):
+#                                      filepath=None, render=True, seed=None, inplace=True):
 # ======================================================================================================================
 # INPUT:
 # ======================================================================================================================
@@ -21,6 +17,12 @@ import seqreader
 ## res: the desired resolution; significant for the addition of noise in later steps. [m]
 ## gamma [optional]: sets the standard deviation for the Gaussian noise distribution. Default = 0.
 ## filepath [optional]: string containing the directory and filename to which the figures are saved.
+## render [optional]: if False, no figures are made and only the noisified profile is read. Default = True.
+## seed [optional]: int or numpy.random.Generator from which the noise is drawn. Default = None, in which case the
+##                  noise is drawn from the global numpy.random state, giving the same noise as in earlier versions
+##                  after the same numpy.random.seed().
+## inplace [optional]: if True, the noise is added to 'y_profile' itself; if False, a copy is noisified and
+##                     'y_profile' is left unchanged. Default = True.
 # ======================================================================================================================
 # OUTPUT:
 # ======================================================================================================================
@@ -30,14 +32,25 @@ import seqreader
 
 
 def gaussian_noise(x_profile, y_profile, derivs, para_boundaries: list, dicts: list, layout: dict, res: int,
-                   gamma: float = 0, filepath: str = None):
+                   gamma: float = 0, filepath: str = None, render: bool = True, seed=None, inplace: bool = True):
+    # Only load the plotting libraries if figures are made:
+    if render:
+        from matplotlib import pyplot as plt
+        from matplotlib import patches
+        from matplotlib.patches import Patch
+        from scipy import stats
+
     # Unpack the derivatives and normalize them:
-    dy = derivs[0] / max(abs(min(derivs[0])), abs(max(derivs[0])))
-    dy2 = derivs[1] / max(abs(min(derivs[1])), abs(max(derivs[1])))
-    dy3 = derivs[2] / max(abs(min(derivs[2])), abs(max(derivs[2])))
+    dy = derivs[0] / np.max(np.abs(derivs[0]))
+    dy2 = derivs[1] / np.max(np.abs(derivs[1]))
+    dy3 = derivs[2] / np.max(np.abs(derivs[2]))
+    if not inplace:
+        y_profile = np.array(y_profile, dtype=float)
+    else:
+        y_profile = np.asarray(y_profile)
 
     # Plot the Gaussian distribution from which gamma-noise is drawn:
-    if gamma != 0:
+    if gamma != 0 and render:
         x0 = np.linspace(-1, 1, 200)
         gaussian_pdf = stats.norm.pdf(x0, loc=0, scale=gamma)
         plt.plot(x0, gaussian_pdf, color='navy', lw=2)
@@ -53,32 +66,21 @@ def gaussian_noise(x_profile, y_profile, derivs, para_boundaries: list, dicts: l
             plt.savefig(filepath + '\Gamma Noise Distribution.png', bbox_inches='tight')
         plt.close()
 
-    # Create a noise profile, and add this noise to the input profile using a Gaussian distribution with sigma=gamma:
-    noise_profile = np.zeros_like(y_profile)
-    for i in range(len(x_profile)):
-        ## Grab a random value from the Gaussian distribution:
-        noise_value = np.random.normal(0, gamma)
-        ## Add to noise profile:
-        noise_profile[i] = noise_value
-        ## Add to y-profile and derivatives:
-        y_profile[i] += noise_value
-        dy[i] += noise_value
-        dy2[i] += noise_value
-        dy3[i] += noise_value
-        ## Correct for limits:
-        ### Upper limits:
-        if y_profile[i] > 1 or y_profile[i] < -1:
-            y_profile[i] /= abs(y_profile[i])
-        if dy[i] > 1 or dy[i] < -1:
-            dy[i] /= abs(dy[i])
-        if dy2[i] > 1 or dy2[i] < -1:
-            dy2[i] /= abs(dy2[i])
-        if dy3[i] > 1 or dy3[i] < -1:
-            dy3[i] /= abs(dy3[i])
+    # Create a noise profile using a Gaussian distribution with sigma=gamma, drawn for all samples at once:
+    if seed is None:
+        noise_profile = np.random.normal(0, gamma, len(x_profile))
+    else:
+        noise_profile = np.random.default_rng(seed).normal(0, gamma, len(x_profile))
+    # Add the noise to the y-profile and derivatives, and correct for the limits [-1, 1]:
+    for profile in [y_profile, dy, dy2, dy3]:
+        profile += noise_profile
+        np.clip(profile, -1, 1, out=profile)
 
     # Read the noisified profile:
     depths, lithologies, flagged_profile = \
         seqreader.profile_reader(x_profile, y_profile, [dy, dy2, dy3], para_boundaries, dicts)
+    if not render:
+        return depths, lithologies
 
     # Now plot both the noisified y-profile and the noise profile:
     ## Create figure and axes:
@@ -153,3 +155,52 @@ def gaussian_noise(x_profile, y_profile, derivs, para_boundaries: list, dicts: l
     plt.close(fig)
 
     return depths, lithologies
+
+
+# scales = derivative_scales(depths):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## depths: a list of depth values signifying the lithology boundaries in 1 parasequence, see synthseq.sequencer(). [m]
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## scales: a list of length 3 containing the amplitudes of the 1st, 2nd and 3rd derivative of a parasequence of the
+##         thickness given in 'depths'; (2*pi/T)**k for T = depths[-1] - depths[0]. For alpha = 0, these are the maxima
+##         by which gaussian_noise() normalizes the derivatives (up to the sampling of the sinusoid).
+
+
+def derivative_scales(depths: list) -> list:
+    wavenumber = (2 * np.pi) / (depths[-1] - depths[0])
+    return [wavenumber, wavenumber ** 2, wavenumber ** 3]
+
+
+# parasequences = noise_stream(parasequences, scales, gamma=0, seed=None):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## parasequences: an iterable yielding for each parasequence a tuple (x, y, derivatives, boundaries, para_dict), as
+##                obtained from synthseq.sequencer_stream().
+## scales: a list of length 3 containing the values by which the 1st, 2nd and 3rd derivative are normalized, e.g. as
+##         obtained from derivative_scales(). While streaming, the maxima over the whole profile that gaussian_noise()
+##         uses are not known in advance.
+## gamma [optional]: sets the standard deviation for the Gaussian noise distribution. Default = 0.
+## seed [optional]: see gaussian_noise(). The noise of consecutive parasequences is drawn from one stream, so it equals
+##                  the noise gaussian_noise() draws for the concatenated profile.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## parasequences: a generator yielding the tuples of 'parasequences' with the noise added to the y-values and to the
+##                normalized derivatives, clipped to [-1, 1] as in gaussian_noise(). The arrays of 'parasequences' are
+##                left unchanged. Can be passed to seqreader.stream_reader().
+
+
+def noise_stream(parasequences, scales: list, gamma: float = 0, seed=None):
+    normal = np.random.normal if seed is None else np.random.default_rng(seed).normal
+    for x, y, derivatives, boundaries, para_dict in parasequences:
+        noise_profile = normal(0, gamma, len(x))
+        ## Add the noise to the y-profile and the normalized derivatives, and correct for the limits [-1, 1]:
+        profiles = [y + noise_profile] + [derivatives[k] / scales[k] + noise_profile for k in range(3)]
+        for profile in profiles:
+            np.clip(profile, -1, 1, out=profile)
+        yield x, profiles[0], profiles[1:], boundaries, para_dict
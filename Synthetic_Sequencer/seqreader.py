@@ -2,6 +2,7 @@ import numpy as np
 from random import randrange
 # Custom imports:
 import synthtools as syn
+from Numerical_Tools import faciesseq as fs
 
 
 # flag, sieves = sieve(y, dy_dx, dy_dx2, dy_dx3, para_dict):
@@ -126,6 +127,205 @@ def bottom_sieve(sieves):
     return flag
 
 
+# table = compile_sieve(para_dict):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## para_dict: dictionary with lith:[y_range,  derivative signs] as key:value pairs.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## table: a tuple (liths, lows, highs, signs, midpoints) containing the lithologies of 'para_dict' in order, the lower
+##        and upper bounds of their value ranges (rounded as in sieve()), an integer array with shape (3, L) holding
+##        the required sign of the 1st, 2nd and 3rd derivative of every lithology (1 = 'pos', -1 = 'neg',
+##        0 = 'both'), and the midpoints of the value ranges (as in midpoint_sieve()).
+
+
+def compile_sieve(para_dict: dict):
+    liths = list(para_dict)
+    lows = np.asarray([round(para_dict[lith][0][0], 2) for lith in liths], dtype=float)
+    highs = np.asarray([round(para_dict[lith][0][1], 2) for lith in liths], dtype=float)
+    ## Signs that sieve() never matches are coded as 2:
+    codes = {'pos': 1, 'neg': -1, 'both': 0}
+    signs = np.asarray([[codes.get(para_dict[lith][k], 2) for lith in liths] for k in (1, 2, 3)], dtype=np.int8)
+    midpoints = np.asarray([(para_dict[lith][0][0] + para_dict[lith][0][1]) / 2 for lith in liths], dtype=float)
+    return liths, lows, highs, signs, midpoints
+
+
+# signs = rounded_signs(values):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## values: an array or list of derivative values.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## signs: an array containing the sign (1, -1 or 0) of every value after rounding to 3 decimals, as in sieve(); NaN
+##        values get the code 3, which matches no lithology.
+
+
+def rounded_signs(values) -> np.ndarray:
+    # Round in the same way as round() does on the elements themselves:
+    if isinstance(values, np.ndarray):
+        rounded = np.round(values, 3)
+    else:
+        rounded = np.asarray([round(value, 3) for value in values], dtype=float)
+    signs = np.sign(rounded)
+    return np.where(np.isnan(signs), 3, signs).astype(np.int8)
+
+
+# codes = sieve_batch(y, signs, table):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## y: array of length S containing y-values.
+## signs: integer array with shape (3, S) containing the rounded signs of the 1st, 2nd and 3rd derivatives at the same
+##        points, as obtained from rounded_signs().
+## table: the compiled para_dict, as obtained from compile_sieve().
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## codes: integer array of length S containing per point the index in table[0] of the lithology assigned by sieve(),
+##        or -1 where sieve() assigns none ('NONE'). The sieves are applied to all points at once with boolean masks
+##        of shape (L, S), in the same order and with the same tie-breaking as sieve().
+
+
+def sieve_batch(y: np.ndarray, signs: np.ndarray, table) -> np.ndarray:
+    liths, lows, highs, lith_signs, midpoints = table
+    codes = np.full(len(y), -1, dtype=np.intp)
+    # SIEVE 1: VALUE RANGE:
+    passed = (y[None, :] >= lows[:, None]) & (y[None, :] <= highs[:, None])
+    unresolved = np.ones(len(y), dtype=bool)
+    for k in range(4):
+        ## A point is flagged by the first sieve that leaves exactly one lithology:
+        count = np.sum(passed, axis=0)
+        flagged = unresolved & (count == 1)
+        codes[flagged] = np.argmax(passed[:, flagged], axis=0)
+        unresolved &= ~flagged
+        if k == 3:
+            break
+        # SIEVES 2-4: DERIVATIVE SIGNS; a sieve is only entered if the previous one did not leave a single lithology:
+        passed = passed & unresolved[None, :] & (signs[k][None, :] == lith_signs[k][:, None])
+    return codes
+
+
+# codes = midpoint_sieve_batch(y, table):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## y: array of length S containing y-values that sieve() leaves un-flagged.
+## table: the compiled para_dict, as obtained from compile_sieve().
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## codes: integer array of length S containing per point the index in table[0] of the lithology assigned by
+##        midpoint_sieve() to the lithologies of the value-range sieve, or -1 where it assigns none.
+
+
+def midpoint_sieve_batch(y: np.ndarray, table) -> np.ndarray:
+    liths, lows, highs, lith_signs, midpoints = table
+    passed = (y[None, :] >= lows[:, None]) & (y[None, :] <= highs[:, None])
+    dist = np.where(passed, np.abs(y[None, :] - midpoints[:, None]), np.inf)
+    nearest = dist == np.min(dist, axis=0)[None, :]
+    ## Exactly one lithology at the minimum distance, and at least one in the value-range sieve:
+    flagged = (np.sum(nearest & passed, axis=0) == 1) & np.any(passed, axis=0)
+    return np.where(flagged, np.argmax(nearest & passed, axis=0), -1)
+
+
+# indices = parasequence_indices(x_profile, para_boundaries, n):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## x_profile: the x-axis of the complete vertical profile.
+## para_boundaries: a list of length n+1 containing the x-values of the parasequence boundaries (includes x=0).
+## n: the number of parasequences.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## indices: integer array containing per grid-point the index of the parasequence dictionary that profile_reader()
+##          uses for it. The reader steps to the next dictionary at most once per grid-point, whenever the point lies
+##          outside the current parasequence; for an increasing profile this is computed at once.
+
+
+def parasequence_indices(x_profile, para_boundaries, n: int) -> np.ndarray:
+    x = np.asarray(x_profile, dtype=float)
+    bounds = np.asarray(para_boundaries[:n + 1], dtype=float)
+    if len(x) > 0 and np.all(np.isfinite(x)) and np.all(np.diff(x) >= 0) and x[0] >= bounds[0] and \
+            np.all(np.diff(bounds) > 0):
+        ## The parasequence each point lies in, and the lag of at most one step per point:
+        ideal = np.clip(np.searchsorted(bounds, x, side='right') - 1, 0, n - 1)
+        steps = np.arange(len(x))
+        return steps + np.minimum(np.minimum.accumulate(ideal - steps), 1)
+    indices = np.empty(len(x), dtype=np.intp)
+    n_count = 0
+    for i in range(len(x)):
+        if not ((x_profile[i] >= para_boundaries[n_count]) and (x_profile[i] < para_boundaries[n_count + 1])):
+            if n_count < n - 1:
+                n_count += 1
+        indices[i] = n_count
+    return indices
+
+
+# liths, codes = profile_codes(x_profile, y_profile, derivs, para_boundaries, dicts):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## x_profile, y_profile, derivs, para_boundaries, dicts: see profile_reader().
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## liths: a list containing every lithology assigned to a grid-point, in order of first appearance in 'dicts'.
+## codes: integer array containing for each grid-point the index in 'liths' of its assigned lithology.
+
+
+def profile_codes(x_profile, y_profile, derivs, para_boundaries, dicts: list):
+    # Round the derivatives and take their signs for all grid-points at once:
+    signs = np.stack([rounded_signs(derivs[0]), rounded_signs(derivs[1]), rounded_signs(derivs[2])])
+    y = np.asarray(y_profile, dtype=float)
+
+    # Assign each x_tick a lithology 'flag', one parasequence at a time:
+    indices = parasequence_indices(x_profile, para_boundaries, len(dicts))
+    ## All lithologies, and per grid-point the index of its flag in this list:
+    liths = []
+    codes = np.empty(len(y), dtype=np.intp)
+    midpoint_flagged = np.zeros(len(y), dtype=bool)
+    for n_count in np.unique(indices):
+        para_dict = dicts[n_count]
+        table = compile_sieve(para_dict)
+        points = np.flatnonzero(indices == n_count)
+        ### Pass the y-values of the parasequence through the sieves:
+        para_codes = sieve_batch(y[points], signs[:, points], table)
+        ### Filter out un-flagged grid-points with the midpoint-sieve:
+        unflagged = np.flatnonzero(para_codes < 0)
+        para_codes[unflagged] = midpoint_sieve_batch(y[points[unflagged]], table)
+        midpoint_flagged[points[unflagged]] = para_codes[unflagged] >= 0
+        for lith in table[0]:
+            if lith not in liths:
+                liths.append(lith)
+        lookup = np.asarray([liths.index(lith) for lith in table[0]] + [-1], dtype=np.intp)
+        codes[points] = lookup[para_codes]
+    ## Pass the remaining grid-points through the sieves one by one, in profile order; midpoint_sieve() reports every
+    ## grid-point it flags:
+    reported = 0
+    for i in list(np.flatnonzero(codes < 0)) + [len(y)]:
+        flagged = int(np.sum(midpoint_flagged[reported:i]))
+        if flagged > 0:
+            print(*(['Midpoint sieve successfully utilized.'] * flagged), sep='\n')
+        reported = i
+        if i == len(y):
+            break
+        para_dict = dicts[indices[i]]
+        flag, sieves = sieve(y_profile[i], derivs[0][i], derivs[1][i], derivs[2][i], para_dict)
+        if flag == 'NONE':
+            flag = midpoint_sieve(y_profile[i], sieves[0], para_dict)
+            if flag == 'NONE':
+                flag = bottom_sieve(sieves)
+        if flag not in liths:
+            liths.append(flag)
+        codes[i] = liths.index(flag)
+    return liths, codes
+
+
 # depths, lithologies, flagged_profile = profile_reader(x_profile, y_profile, derivs, para_boundaries, dicts):
 # ======================================================================================================================
 # INPUT:
@@ -145,43 +345,44 @@ def bottom_sieve(sieves):
 
 
 def profile_reader(x_profile, y_profile, derivs, para_boundaries, dicts: list):
-    # Unpack the derivatives:
-    dy_dx = derivs[0]
-    dy_dx2 = derivs[1]
-    dy_dx3 = derivs[2]
-
-    # Create a profile where each x_tick is assigned a lithology 'flag':
-    ## Parasequence counter:
-    n_count: int = 0
-    ## Lithology storage:
-    flagged_profile = []
-    for i in range(len(x_profile)):
-        ### Make sure you look in the appropriate dictionary:
-        if (x_profile[i] >= para_boundaries[n_count]) and (x_profile[i] < para_boundaries[n_count + 1]):
-            para_dict = dicts[n_count]
-            #### Pass the current y-value through the sieve:
-            flag, sieves = sieve(y_profile[i], dy_dx[i], dy_dx2[i], dy_dx3[i], para_dict)
-            #### Filter out un-flagged grid-points:
-            if flag == 'NONE':
-                flag = midpoint_sieve(y_profile[i], sieves[0], para_dict)
-                if flag == 'NONE':
-                    flag = bottom_sieve(sieves)
-            flagged_profile.append(flag)
-
-        else:
-            if n_count < len(dicts) - 1:
-                n_count += 1
-            para_dict = dicts[n_count]
-            #### Pass the current y-value through the sieve:
-            flag, sieves = sieve(y_profile[i], dy_dx[i], dy_dx2[i], dy_dx3[i], para_dict)
-            #### Filter out un-flagged grid-points:
-            if flag == 'NONE':
-                flag = midpoint_sieve(y_profile[i], sieves[0], para_dict)
-                if flag == 'NONE':
-                    flag = bottom_sieve(sieves)
-            flagged_profile.append(flag)
+    liths, codes = profile_codes(x_profile, y_profile, derivs, para_boundaries, dicts)
+    flagged_profile = [liths[code] for code in codes.tolist()]
 
     # Now, from the flagged profile, create a list of boundary depths and a list of lithologies:
     depths, lithologies = syn.flagged_reader(x_profile, flagged_profile)
 
     return depths, lithologies, flagged_profile
+
+
+# depths, lithologies = stream_reader(parasequences, compact=False):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## parasequences: an iterable yielding for each parasequence a tuple (x, y, derivatives, boundaries, para_dict), as
+##                obtained from synthseq.sequencer_stream() or noisify.noise_stream().
+## compact [optional]: if True, the lithologies are returned as a FaciesSequence instead of a list. Default = False.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## depths, lithologies: the lithological units read from the profile, as returned by profile_reader(). Every
+##                      parasequence is flagged as soon as it is yielded and only its run-length code is kept, so the
+##                      memory used grows with the number of units rather than with the number of grid-points.
+
+
+def stream_reader(parasequences, compact: bool = False):
+    ## All lithologies, in order of first appearance:
+    classes = []
+
+    def coded_parasequences():
+        for x, y, derivatives, boundaries, para_dict in parasequences:
+            liths, codes = profile_codes(x, y, derivatives, boundaries, [para_dict])
+            for lith in liths:
+                if lith not in classes:
+                    classes.append(lith)
+            lookup = np.asarray([classes.index(lith) for lith in liths], dtype=np.intp)
+            yield x, lookup[codes]
+
+    depths, codes = syn.chunked_code_reader(coded_parasequences())
+    if compact:
+        return depths, fs.FaciesSequence(codes, classes)
+    return depths, [classes[code] for code in codes.tolist()]
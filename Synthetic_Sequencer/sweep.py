@@ -0,0 +1,279 @@
+import os
+import io
+import random
+import hashlib
+import itertools
+import contextlib
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+# Custom imports:
+import synthseq as seq
+import noisify as noise
+from Burgess_Model import main as burg
+
+# The parameters of a sweep cell, in the order of the columns of the results table, with their default values; 'res'
+# and 'n' have no default and must be given in the grid:
+PARAMETERS = ['alpha', 'beta', 'psi', 'omega', 'gamma', 'res', 'n', 'replicate']
+DEFAULTS = {'alpha': 0, 'beta': 0, 'psi': 0, 'omega': 0, 'gamma': 0}
+# The columns of the results table after the parameters:
+RESULTS = ['seed', 'm_max', 'candidates', 'sifted', 'units', 'seconds', 'error']
+
+
+# cells = sweep_cells(grid, replicates=1):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## grid: a dictionary containing as key:value pairs 'parameter:list of values' for the parameters 'alpha', 'beta',
+##       'psi', 'omega', 'gamma', 'res' and 'n' (see synthseq.sequencer() and noisify.gaussian_noise()). Parameters
+##       that are left out take the value in DEFAULTS; 'res' and 'n' are required.
+## replicates [optional]: int; the number of realizations per combination of parameter values. Default = 1.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## cells: a list containing a dictionary per cell of the sweep, with a value for every entry of PARAMETERS; all
+##        combinations of the grid values, each repeated for replicate = 0, ..., replicates - 1.
+
+
+def sweep_cells(grid: dict, replicates: int = 1) -> list:
+    unknown = [key for key in grid if key not in PARAMETERS[:-1]]
+    if len(unknown) > 0:
+        raise ValueError('Unknown sweep parameters: ' + ', '.join(unknown) + '.')
+    for key in ['res', 'n']:
+        if key not in grid:
+            raise ValueError("The sweep grid needs values for '" + key + "'.")
+    values = [list(grid.get(key, [DEFAULTS.get(key)])) for key in PARAMETERS[:-1]] + [list(range(replicates))]
+    return [dict(zip(PARAMETERS, combination)) for combination in itertools.product(*values)]
+
+
+# cell_seed = sweep_seed(cell, seed=0):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## cell: a dictionary containing the parameters of one cell, as obtained from sweep_cells().
+## seed [optional]: int; the seed of the whole sweep. Default = 0.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## cell_seed: int in [0, 2**63); the seed of the cell, derived from 'seed' and the parameter values of the cell
+##            only, so that a cell draws the same realization whatever the grid, order or number of workers.
+
+
+def sweep_seed(cell: dict, seed: int = 0) -> int:
+    key = repr([seed] + [float(cell[key]) for key in PARAMETERS])
+    return int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], 'little') >> 1
+
+
+# row = run_cell(cell, cell_seed, para_depths, para_lithologies, layout, options):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## cell: a dictionary containing the parameters of one cell, as obtained from sweep_cells().
+## cell_seed: int; the seed of the cell, as obtained from sweep_seed().
+## para_depths, para_lithologies: the depths and lithologies of one parasequence, see synthseq.sequencer().
+## layout: a dictionary containing as key:value pairs 'facies class:[color, hatch]'.
+## options: a dictionary containing the keyword arguments passed on to main.compute().
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## row: a dictionary containing the parameters of the cell and an entry per column of RESULTS:
+##      seed: 'cell_seed'.
+##      m_max: the highest Markov order metric of the noisified synthetic sequence; NaN if the cell failed.
+##      candidates: the number of numberings reaching m_max (len(result2)).
+##      sifted: the number of these with aligned diagonal pairs (len(result3)).
+##      units: the number of lithological units read from the noisified profile.
+##      seconds: the wall-clock time of the cell. [s]
+##      error: the message of the ValueError raised by the cell (e.g. a negative layer thickness drawn by the
+##             sequencer), the type and message of any other exception, or an empty string. A failing cell
+##             never stops the sweep.
+## The sequencer draws from the global 'random' and 'numpy.random' states, which are seeded with 'cell_seed'; the
+## noise is drawn from its own generator spawned from 'cell_seed'. Nothing is printed or drawn.
+
+
+def run_cell(cell: dict, cell_seed: int, para_depths: list, para_lithologies: list, layout: dict,
+             options: dict) -> dict:
+    start = perf_counter()
+    sequencer_seed, noise_seed = np.random.SeedSequence(cell_seed).spawn(2)
+    random.seed(cell_seed)
+    np.random.seed(sequencer_seed.generate_state(1)[0])
+    row = dict(cell, seed=cell_seed, m_max=np.nan, candidates=0, sifted=0, units=0, error='')
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            x, y, derivatives, para_boundaries, dicts = \
+                seq.sequencer(np.array(para_depths, dtype=float), list(para_lithologies), layout, cell['res'],
+                              int(cell['n']), alpha=cell['alpha'], beta=cell['beta'], psi=cell['psi'],
+                              omega=cell['omega'], render=False)
+            depths, lithologies = noise.gaussian_noise(x, y, derivatives, para_boundaries, dicts, layout, cell['res'],
+                                                       gamma=cell['gamma'], render=False,
+                                                       seed=np.random.default_rng(noise_seed))
+            result1, result2, result3 = burg.compute(depths, lithologies, layout, **options)
+    except ValueError as error:
+        row['error'] = str(error)
+    except Exception as error:
+        row['error'] = type(error).__name__ + ': ' + str(error)
+    else:
+        if len(result2) > 0:
+            row['m_max'] = float(result2[0][1])
+        row['candidates'], row['sifted'], row['units'] = len(result2), len(result3), len(lithologies)
+    row['seconds'] = perf_counter() - start
+    return row
+
+
+# directory = shard_directory(path):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## path: string containing the path of the results table (.npz).
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## directory: string containing the directory in which run_sweep() writes one small table (shard) per finished cell,
+##            until they are merged into 'path'.
+
+
+def shard_directory(path: str) -> str:
+    return path + '.shards'
+
+
+# table = load_sweep(path):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## path: string containing the path of the results table (.npz).
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## table: a dictionary containing a list per column (PARAMETERS + RESULTS), one entry per computed cell; the rows of
+##        'path' followed by those of the shards that were not merged yet (e.g. of an interrupted sweep). A cell that
+##        occurs more than once is only listed once. Empty lists if nothing has been computed yet.
+
+
+def load_sweep(path: str) -> dict:
+    table = {column: [] for column in PARAMETERS + RESULTS}
+    paths = [path] if os.path.isfile(path) else []
+    directory = shard_directory(path)
+    if os.path.isdir(directory):
+        paths += [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith('.npz')]
+    done = set()
+    for file_path in paths:
+        with np.load(file_path) as file:
+            columns = {column: file[column].tolist() for column in PARAMETERS + RESULTS}
+        for i in range(len(columns['seed'])):
+            key = tuple(columns[column][i] for column in PARAMETERS + ['seed'])
+            if key in done:
+                continue
+            done.add(key)
+            for column in PARAMETERS + RESULTS:
+                table[column].append(columns[column][i])
+    return table
+
+
+# save_sweep(path, table):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## path: string containing the path of the results table (.npz).
+## table: a dictionary containing a list per column, as obtained from load_sweep().
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## Writes 'table' to 'path' with one array per column. The table is written to a temporary file first, so that an
+## interrupted sweep never leaves a corrupt table.
+
+
+def save_sweep(path: str, table: dict) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    columns = {column: np.asarray(table[column]) for column in PARAMETERS + RESULTS}
+    columns['error'] = np.asarray(table['error'], dtype=str)
+    temporary_path = path + '.' + str(os.getpid()) + '.tmp'
+    with open(temporary_path, 'wb') as file:
+        np.savez(file, **columns)
+    os.replace(temporary_path, path)
+
+
+# table = merge_sweep(path):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## path: string containing the path of the results table (.npz).
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## table: the results table as obtained from load_sweep(). It is written to 'path' in one go, after which the merged
+##        shards are removed.
+
+
+def merge_sweep(path: str) -> dict:
+    table = load_sweep(path)
+    directory = shard_directory(path)
+    if not os.path.isdir(directory):
+        return table
+    names = [name for name in os.listdir(directory) if name.endswith('.npz')]
+    save_sweep(path, table)
+    ## A shard that is still listed after an interruption here is skipped as a duplicate by load_sweep():
+    for name in names:
+        os.remove(os.path.join(directory, name))
+    if len(os.listdir(directory)) == 0:
+        os.rmdir(directory)
+    return table
+
+
+# table = run_sweep(path, para_depths, para_lithologies, grid, replicates=1, seed=0, layout=None, workers=None,
+#                   **options):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## path: string containing the path of the results table (.npz). If it exists, the cells it (or its shards) already
+##       holds, with the same parameters and seed, are skipped, so an interrupted sweep resumes where it stopped.
+## para_depths: a list of depth values signifying the lithology boundaries in 1 parasequence, see
+##              synthseq.sequencer(). [m]
+## para_lithologies: a list of (unique) lithologies corresponding to the boundaries in 'para_depths'.
+## grid, replicates [optional]: see sweep_cells().
+## seed [optional]: int; the seed of the whole sweep, see sweep_seed(). Default = 0.
+## layout [optional]: a dictionary containing as key:value pairs 'facies class:[color, hatch]'. Default = None (one
+##                    entry per lithology; the colors are not used, as nothing is drawn).
+## workers [optional]: int; the number of worker processes over which the cells are divided. Default = None (serial,
+##                     in the current process). When using workers, call run_sweep() within an
+##                     'if __name__ == "__main__":' block.
+## options [optional]: keyword arguments passed on to main.compute() for every cell, e.g. search='symmetric'.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## table: the results table as obtained from merge_sweep(), holding a row per cell (see run_cell()). Every finished
+##        cell is written at once to its own shard in shard_directory(path), so that the cost of storing a cell does
+##        not grow with the size of the sweep; the shards are merged into 'path' when the sweep is done.
+
+
+def run_sweep(path: str, para_depths: list, para_lithologies: list, grid: dict, replicates: int = 1, seed: int = 0,
+              layout: dict = None, workers: int = None, **options) -> dict:
+    if layout is None:
+        layout = {lith: ['gold', '.'] for lith in para_lithologies}
+    table = load_sweep(path)
+
+    # Skip the cells that were already computed:
+    done = set(zip(*[table[column] for column in PARAMETERS + ['seed']]))
+    cells = []
+    for cell in sweep_cells(grid, replicates):
+        cell_seed = sweep_seed(cell, seed)
+        if tuple(cell[column] for column in PARAMETERS) + (cell_seed,) not in done:
+            cells.append((cell, cell_seed))
+
+    def store(row):
+        shard = os.path.join(shard_directory(path), '%016x.npz' % row['seed'])
+        save_sweep(shard, {column: [row[column]] for column in PARAMETERS + RESULTS})
+
+    if workers is None:
+        for cell, cell_seed in cells:
+            store(run_cell(cell, cell_seed, para_depths, para_lithologies, layout, options))
+        return merge_sweep(path)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [executor.submit(run_cell, cell, cell_seed, para_depths, para_lithologies, layout, options)
+                   for cell, cell_seed in cells]
+        for future in as_completed(futures):
+            store(future.result())
+    finally:
+        ## On an interruption, cancel the cells that have not started; the finished ones are in their shards already:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return merge_sweep(path)
@@ -1,7 +1,5 @@
 from typing import Tuple, Union
 import numpy as np
-from matplotlib import pyplot as plt
-from matplotlib import patches
 import random
 # Custom imports:
 import synthtools as syn
@@ -9,7 +7,8 @@ from Numerical_Tools import stats as st
 
 
 # x, y, derivatives, para_boundaries, dicts = sequencer(depths, lithologies, layout, res, n, alpha=0, beta=0, psi=0,
-#                                                       omega=0, filepath=None):
+#                                                       omega=0, asymmetric=False, filepath=None, render=True,
+#                                                       dtype=np.float64):
 # ======================================================================================================================
 # INPUT:
 # ======================================================================================================================
@@ -30,19 +29,29 @@ from Numerical_Tools import stats as st
 ##                        and derivatives. Default = False.
 ## filepath [optional]: string containing the directory and filename to which the figures are saved. If None, renders
 ##                      the figures within the view screen. Default = None.
+## render [optional]: if False, no figures are made and only the profiles are returned. Default = True.
+## dtype [optional]: the floating point type of the returned profiles, e.g. np.float32 to halve their memory. The
+##                   profiles are computed in double precision either way. Default = np.float64.
 # ======================================================================================================================
 # OUTPUT:
 # ======================================================================================================================
 ## x: the x-axis of the complete vertical profile.
 ## y: the y-axis of the complete vertical profile.
 ## derivatives: a list of length 3 containing 1st, 2nd, and 3rd derivative profiles.
+##              x, y and the derivatives are the rows of one (5, N) array, written in place as the layers are made;
+##              they are views, so no copies are made on return.
 ## para_boundaries: a list of length n+1 containing the x-values of the parasequence boundaries (includes x=0).
 ## dicts: a list of length n containing for each parasequence a dictionary with value ranges for each lithology.
 
 
 def sequencer(depths: list, lithologies: list, layout: dict, res: float, n: int, alpha: float = 0, beta: float = 0,
-              psi: float = 0, omega: float = 0, asymmetric: bool = False, filepath: str = None) -> \
+              psi: float = 0, omega: float = 0, asymmetric: bool = False, filepath: str = None,
+              render: bool = True, dtype=np.float64) -> \
               Union[Tuple[np.ndarray, np.ndarray, list, list, list], Tuple[list, list]]:
+    # Only load the plotting library if figures are made:
+    if render:
+        from matplotlib import pyplot as plt
+        from matplotlib import patches
 
     # Calibrate 'depths' to start at 0:
     if depths[0] != 0:
@@ -52,47 +61,51 @@ def sequencer(depths: list, lithologies: list, layout: dict, res: float, n: int,
     ## Wavelength (total thickness) distribution:
     mu_left, mu_right = depths[-1], depths[-1]
     if alpha != 0:
-        x1 = np.linspace(depths[-1] - 3 * alpha, depths[-1] + 3 * alpha + omega/20 * depths[-1], 200)
-        x1 = np.linspace(0, max(x1) + 0.2*psi*(max(x1)-min(x1)), 200)
-        y1, mu_corrected = st.skewed_norm_pdf(x1, omega, depths[-1], alpha)
         ### Retrieve left and right percentiles and use these as means for two separate distributions:
-        y2, y3, p_left, p_right, mu_left, mu_right = st.pdf_splitter(x1, omega, mu_corrected, alpha, psi)
-        ### Plot the distributions in one graph:
-        plt.plot(x1, y1, lw=2, color='maroon', label=r'$\psi$ = 0')
-        if psi != 0:
-            plt.plot(x1, y2, lw=1.8, color='indianred')
-            plt.plot(x1, y3, lw=1.8, color='indianred')
-        ### Mean lines:
-        plt.vlines(depths[-1], 0, max(y1) + 0.1 * max(y1), linestyle='--', color='maroon', lw=2)
-        if psi != 0:
-            plt.vlines(mu_left, 0, max(y1) + 0.1 * max(y1), color='indianred', linestyle='-.', lw=1.8)
-            plt.vlines(mu_right, 0, max(y1) + 0.1 * max(y1), color='indianred', linestyle='-.', lw=1.8)
-            ### Mean and percentile labels:
-            offset = 0.01*(max(x1) - min(x1))
-            plt.text(mu_left, 0.995*max(y1), 'P' + str(int(round(100*p_left, 0))) + '*', rotation='horizontal',
-                     weight='semibold', ha='center', zorder=10)
-            plt.text(mu_left - 3*offset, 0.15*max(y1), r'$\mu_1$ = ' + str(round(mu_left, 1)) + 'm',
-                     rotation='vertical', weight='medium', va='center', zorder=10)
-            plt.text(mu_right, 0.995*max(y1), 'P' + str(int(round(100*p_right, 0))) + '*', rotation='horizontal',
-                     weight='semibold', ha='center', zorder=10)
-            plt.text(mu_right - 3*offset, 0.15*max(y1), r'$\mu_2$ = ' + str(round(mu_right, 1)) + 'm',
-                     rotation='vertical', weight='medium', va='center', zorder=10)
-        ### Limits, labels, title:
-        plt.xlim(0, max(x1))
-        plt.ylim(0, max(y1) + 0.1 * max(y1))
-        plt.xlabel('Parasequence Thickness [m]')
-        plt.ylabel('Probability Density [-]')
-        plt.title('Parasequence Thickness Distribution' + '\n' + r'$\mu_0$ = ' + str(depths[-1]) + 'm, ' + r'$\sigma$ = ' +
-                  str(alpha) + 'm' + '\n' + r'$\psi = $' + str(psi) + ', ' + r'$\omega$ = ' + str(omega), weight='bold')
-        ### Save or show figure:
-        if filepath is None:
-            plt.show()
-        else:
-            plt.savefig(filepath + '\Parasequence Thickness Distribution.png', bbox_inches='tight')
-        plt.close()
+        mu_corrected = st.corrected_mean(omega, depths[-1], alpha)
+        p_left, p_right, mu_left, mu_right = st.split_means(omega, mu_corrected, alpha, psi)
+        if render:
+            x1 = np.linspace(depths[-1] - 3 * alpha, depths[-1] + 3 * alpha + omega/20 * depths[-1], 200)
+            x1 = np.linspace(0, max(x1) + 0.2*psi*(max(x1)-min(x1)), 200)
+            y1, mu_corrected = st.skewed_norm_pdf(x1, omega, depths[-1], alpha)
+            y2, y3 = st.pdf_splitter(x1, omega, mu_corrected, alpha, psi)[:2]
+            ### Plot the distributions in one graph:
+            plt.plot(x1, y1, lw=2, color='maroon', label=r'$\psi$ = 0')
+            if psi != 0:
+                plt.plot(x1, y2, lw=1.8, color='indianred')
+                plt.plot(x1, y3, lw=1.8, color='indianred')
+            ### Mean lines:
+            plt.vlines(depths[-1], 0, max(y1) + 0.1 * max(y1), linestyle='--', color='maroon', lw=2)
+            if psi != 0:
+                plt.vlines(mu_left, 0, max(y1) + 0.1 * max(y1), color='indianred', linestyle='-.', lw=1.8)
+                plt.vlines(mu_right, 0, max(y1) + 0.1 * max(y1), color='indianred', linestyle='-.', lw=1.8)
+                ### Mean and percentile labels:
+                offset = 0.01*(max(x1) - min(x1))
+                plt.text(mu_left, 0.995*max(y1), 'P' + str(int(round(100*p_left, 0))) + '*', rotation='horizontal',
+                         weight='semibold', ha='center', zorder=10)
+                plt.text(mu_left - 3*offset, 0.15*max(y1), r'$\mu_1$ = ' + str(round(mu_left, 1)) + 'm',
+                         rotation='vertical', weight='medium', va='center', zorder=10)
+                plt.text(mu_right, 0.995*max(y1), 'P' + str(int(round(100*p_right, 0))) + '*', rotation='horizontal',
+                         weight='semibold', ha='center', zorder=10)
+                plt.text(mu_right - 3*offset, 0.15*max(y1), r'$\mu_2$ = ' + str(round(mu_right, 1)) + 'm',
+                         rotation='vertical', weight='medium', va='center', zorder=10)
+            ### Limits, labels, title:
+            plt.xlim(0, max(x1))
+            plt.ylim(0, max(y1) + 0.1 * max(y1))
+            plt.xlabel('Parasequence Thickness [m]')
+            plt.ylabel('Probability Density [-]')
+            plt.title('Parasequence Thickness Distribution' + '\n' + r'$\mu_0$ = ' + str(depths[-1]) + 'm, ' +
+                      r'$\sigma$ = ' + str(alpha) + 'm' + '\n' + r'$\psi = $' + str(psi) + ', ' + r'$\omega$ = ' +
+                      str(omega), weight='bold')
+            ### Save or show figure:
+            if filepath is None:
+                plt.show()
+            else:
+                plt.savefig(filepath + '\Parasequence Thickness Distribution.png', bbox_inches='tight')
+            plt.close()
 
     ## For each layer, plot the layer thickness distribution:
-    if beta != 0:
+    if beta != 0 and render:
         max_thickness = 0
         min_thickness = 1e5
         ### Find a fitting x-range:
@@ -129,20 +142,148 @@ def sequencer(depths: list, lithologies: list, layout: dict, res: float, n: int,
             plt.savefig(filepath + '\Layer Thickness Distributions.png', bbox_inches='tight')
         plt.close()
 
+    # Draw the total thickness and the layer boundaries (relative to the top) of every parasequence:
+    para_layers = list(parasequence_layers(depths, lithologies, n, alpha=alpha, beta=beta, psi=psi, omega=omega))
+
     # Create the sinusoid profile:
-    ## These will store the full profile but in parasequence-, layer- segments:
-    x_segmented = []
-    y_segmented = []
-    dy_dx_segmented = []
-    dy_dx2_segmented = []
-    dy_dx3_segmented = []
-    ## These will store the parasequence- and the layer-boundary values, respectively:
-    para_boundaries = [0]
-    layer_boundaries = []
-    ## Store for each parasequence a dictionary containing its characteristic sieve parameters for each layer:
-    dicts = []
+    profile, para_boundaries, layer_boundaries, dicts, x_segmented, y_segmented = \
+        layer_profile(para_layers, lithologies, res, dense=not asymmetric, dtype=dtype, segments=render)
+
+    # Plot every parasequence:
+    if render:
+        for i in range(n):
+            x_parasequence, y_parasequence = x_segmented[i], y_segmented[i]
+            for j in range(len(x_parasequence)):
+                plt.plot(y_parasequence[j], x_parasequence[j], color=layout[lithologies[j]][0], lw=2)
+                plt.hlines(layer_boundaries[i][j], -1, 1)
+                plt.text(1.1, ((layer_boundaries[i][j + 1] + layer_boundaries[i][j]) / 2), lithologies[j],
+                         va='center', ha='center')
+            plt.vlines(0, min(x_parasequence[0]), max(x_parasequence[-1]), linestyle='--')
+            plt.xlim(-1, 1)
+            plt.yticks(np.arange(min(x_parasequence[0]), max(x_parasequence[-1]) + res * 10, res * 10))
+            plt.ylim(max(x_parasequence[-1]), min(x_parasequence[0]))
+            plt.ylabel('Depth [m]')
+            plt.title('(Para)sequence no.' + str(i + 1), weight='bold')
+            if filepath is None:
+                plt.show()
+            else:
+                plt.savefig(filepath + '\Parasequence no.' + str(i + 1) + '.png', bbox_inches='tight')
+            plt.close()
+
+    # Plot the full sinusoid profile:
+    if render:
+        ## Create figure and axes:
+        fig, axes = plt.subplots(nrows=1, ncols=2)
+        fig.set_size_inches(6, 4*len(dicts))
+        ## Plot the sine curve and layer boundaries:
+        ### For every parasequence:
+        for i in range(n):
+            #### Plot each layer with its own color, label and horizontal boundary:
+            for j in range(len(y_segmented[i])):
+                axes[0].plot(y_segmented[i][j], x_segmented[i][j], color=layout[lithologies[j]][0], lw=2)
+                axes[0].hlines(layer_boundaries[i][j], -1, 1, lw=1, linestyle='-.')
+        ## Plot center-line:
+        axes[0].vlines(0, 0, max(x_segmented[-1][-1]))
+        ## Plot the parasequence boundaries and labels:
+        for i in range(n):
+            ### Parasequence boundaries:
+            axes[0].hlines(para_boundaries[i], -1, 1, lw=2, linestyle='--')
+            axes[1].hlines(para_boundaries[i], 0, 0.2, lw=2, linestyle='-')
+            ### Parasequence label:
+            para_thickness = para_boundaries[i+1] - para_boundaries[i]
+            axes[0].text(1.1, para_boundaries[i] + (para_thickness / 2), 'n = ' + str(i + 1) +
+                         '\n' + str(round(para_thickness, 1)) + 'm')
+        ## Add a lithology bar:
+        ### Create indents:
+        indents = np.linspace(0.5, 0.25, len(lithologies))
+        indent_dict = {}
+        for i in range(len(lithologies)):
+            indent_dict[lithologies[i]] = indents[i]
+        ### Create the lithology bar with indents:
+        for i in range(n):
+            for j in range(len(lithologies)):
+                #### Add lithology patch:
+                axes[1].add_patch(patches.Rectangle((0, layer_boundaries[i][j]), indent_dict[lithologies[j]],
+                                                    layer_boundaries[i][j + 1] - layer_boundaries[i][j],
+                                                    edgecolor='black', hatch=layout[lithologies[j]][1],
+                                                    facecolor=layout[lithologies[j]][0]))
+                #### Add layer thickness label:
+                layer_thickness = layer_boundaries[i][j+1] - layer_boundaries[i][j]
+                axes[1].text(0.525, layer_boundaries[i][j] + layer_thickness / 2, str(round(layer_thickness, 1)) + 'm')
+        ## Limits, labels, titles:
+        ### Axes 0:
+        axes[0].set_xlim(-1, 1)
+        axes[0].set_ylim(max(x_segmented[-1][-1]), min(x_segmented[0][0]))
+        axes[0].set_ylabel('Depth [m]')
+        axes[0].set_xlabel('Code value [-]')
+        axes[0].set_title('Vertical Profile - ' + str(n) + ' (Para)sequences' + '\n' + r'$\alpha$ = ' + str(alpha) +
+                          'm, ' + r'$\beta$ = ' + str(beta) + 'm', weight='bold')
+        ### Axes 1:
+        axes[1].set_xlim(0, 0.2)
+        axes[1].set_ylim(max(x_segmented[-1][-1]), min(x_segmented[0][0]))
+        axes[1].set_xticks(indents)
+        axes[1].set_xticklabels(lithologies, weight='semibold', fontsize='medium', rotation=90)
+        axes[1].set_yticks([])
+        axes[1].set_title('Lithologies:', weight='semibold', fontsize=10)
+
+        ### Save or show the figure:
+        if filepath is None:
+            plt.show()
+        else:
+            plt.subplots_adjust(wspace=0.4)
+            plt.savefig(filepath + '\Full Vertical Profile.png', dpi=fig.dpi, bbox_inches='tight')
+        plt.close(fig)
+
+    ## If asymmetric = True, return list of lithologies and depths:
+    if asymmetric:
+        asymmetric_lithologies = []
+        asymmetric_depths = [0]
+        for i in range(n):
+            asymmetric_lithologies += lithologies
+            for j in range(len(layer_boundaries[i])):
+                if j > 0:
+                    asymmetric_depths.append(layer_boundaries[i][j])
+                else:
+                    pass
+        return asymmetric_depths, asymmetric_lithologies
+
+    # The profiles are views of the rows of the single profile buffer:
+    x, y = profile[0], profile[1]
+    derivatives = [profile[2], profile[3], profile[4]]
+    return x, y, derivatives, para_boundaries, dicts
+
+
+# para_layers = parasequence_layers(depths, lithologies, n, alpha=0, beta=0, psi=0, omega=0, rng=None):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## depths: a list of depth values signifying the lithology boundaries in 1 parasequence, starting at 0. Size M+1. [m]
+## lithologies, n, alpha, beta, psi, omega: see sequencer().
+## rng [optional]: numpy.random.Generator from which all thicknesses and the compensational stacking starting point
+##                 are drawn. Default = None, in which case they are drawn from the global 'random' and 'numpy.random'
+##                 states, in the same order as in earlier versions of sequencer().
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## para_layers: a generator yielding for each of the n parasequences a tuple (d_tot, layers); its total thickness and
+##              an array of length M+1 with its layer boundaries relative to its top. The thicknesses of a
+##              parasequence are only drawn when it is requested.
+
+
+def parasequence_layers(depths: list, lithologies: list, n: int, alpha: float = 0, beta: float = 0, psi: float = 0,
+                        omega: float = 0, rng=None):
+    mu_left, mu_right = depths[-1], depths[-1]
+    if alpha != 0:
+        mu_corrected = st.corrected_mean(omega, depths[-1], alpha)
+        mu_left, mu_right = st.split_means(omega, mu_corrected, alpha, psi)[2:]
+    ## The thicknesses are drawn through cached inverse-CDF tables:
+    para_sampler = st.SkewNormSampler(omega, alpha, rng=rng) if alpha != 0 else None
+    layer_sampler = st.SkewNormSampler(omega, beta, rng=rng) if beta != 0 else None
     ## Compensational stacking starting point:
-    left_start = random.choice([True, False])
+    if rng is None:
+        left_start = random.choice([True, False])
+    else:
+        left_start = bool(rng.integers(0, 2))
     for i in range(n):
         d_tot = depths[-1]
         ### Grab a total thickness from the Gaussian distribution if alpha is nonzero:
@@ -150,15 +291,15 @@ def sequencer(depths: list, lithologies: list, layout: dict, res: float, n: int,
             if left_start:
                 #### Compensational stacking: alternate between the left and right distributions, start at left:
                 if (i % 2) == 0:
-                    d_tot = st.skewed_norm_rvs(omega, mu_left, alpha)
+                    d_tot = para_sampler.draw(mu_left)
                 else:
-                    d_tot = st.skewed_norm_rvs(omega, mu_right, alpha)
+                    d_tot = para_sampler.draw(mu_right)
             if not left_start:
                 #### Compensational stacking: alternate between the left and right distributions, start at right:
                 if (i % 2) == 0:
-                    d_tot = st.skewed_norm_rvs(omega, mu_right, alpha)
+                    d_tot = para_sampler.draw(mu_right)
                 else:
-                    d_tot = st.skewed_norm_rvs(omega, mu_left, alpha)
+                    d_tot = para_sampler.draw(mu_left)
 
         ### Determine the layer boundaries within the ith parasequence:
         layers = [0]
@@ -167,19 +308,76 @@ def sequencer(depths: list, lithologies: list, layout: dict, res: float, n: int,
             layer_thickness = depths[j+1] - depths[j]
             if beta != 0:
                 #### Grab layer thicknesses from their respective Gaussian distributions if beta is nonzero:
-                layer_thickness = st.skewed_norm_rvs(omega, depths[j + 1] - depths[j], beta)
+                layer_thickness = layer_sampler.draw(depths[j + 1] - depths[j])
             para_thickness += layer_thickness
             layers.append(para_thickness)
         #### Normalize to the parasequence thickness:
         layers = (np.asarray(layers) / para_thickness) * d_tot
+        yield d_tot, layers
+
+
+# profile, para_boundaries, layer_boundaries, dicts, x_segmented, y_segmented = \
+#     layer_profile(para_layers, lithologies, res, dense=True, dtype=np.float64, segments=False, offset=0, index=0):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## para_layers: a list of length n containing for each parasequence a tuple (d_tot, layers); its total thickness and
+##              an array of length M+1 with its layer boundaries relative to its top, as drawn in sequencer(). [m]
+## lithologies: a list of (unique) lithologies corresponding to the layers. Size M.
+## res: the desired resolution. [m]
+## dense [optional]: if False, only the boundaries and dictionaries are made and 'profile' is None. Default = True.
+## dtype [optional]: the floating point type of 'profile'. Default = np.float64.
+## segments [optional]: if True, the x- and y-values of every layer are also returned separately, as the figures of
+##                      sequencer() need them. Default = False.
+## offset [optional]: the depth of the top of the first parasequence, e.g. when the profile is made one parasequence
+##                    at a time. Default = 0. [m]
+## index [optional]: the number of parasequences above the first one, used in the error messages only. Default = 0.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## profile: array with shape (5, N) containing as rows the x-axis, the y-axis and the 1st, 2nd and 3rd derivative
+##          profiles of the complete vertical profile, filled layer by layer without intermediate copies.
+## para_boundaries: a list of length n+1 containing the x-values of the parasequence boundaries (includes 'offset').
+## layer_boundaries: a list of length n containing an array of the x-values of the layer boundaries per parasequence.
+## dicts: a list of length n containing for each parasequence a dictionary with value ranges for each lithology.
+## x_segmented, y_segmented: lists of length n containing a list with the x- and y-values of every layer; empty lists
+##                           if 'segments' is False.
+
+
+def layer_profile(para_layers: list, lithologies: list, res: float, dense: bool = True, dtype=np.float64,
+                  segments: bool = False, offset: float = 0, index: int = 0):
+    # Count the samples of the full profile up front; every layer after the first shares its first sample with the
+    # last sample of the layer above:
+    samples = 1
+    for i in range(len(para_layers)):
+        layers = para_layers[i][1]
+        for j in range(len(lithologies)):
+            layer_samples = syn.range_count(layers[j], layers[j+1], res)
+            if layer_samples < 1:
+                raise ValueError('Layer ' + str(j + 1) + ' of parasequence ' + str(index + i + 1) + ' has a negative '
+                                 'thickness (' + str(layers[j+1] - layers[j]) + ' m); lower alpha, beta or omega.')
+            samples += layer_samples - 1
+
+    # One buffer holds the full profile (x, y and the three derivatives), filled layer by layer:
+    profile = np.empty((5, samples), dtype=dtype) if dense else None
+    position = 0
+    ## These will store the full profile in parasequence-, layer- segments, for the figures only:
+    x_segmented = []
+    y_segmented = []
+    ## These will store the parasequence- and the layer-boundary values, respectively:
+    para_boundaries = [offset]
+    layer_boundaries = []
+    ## Store for each parasequence a dictionary containing its characteristic sieve parameters for each layer:
+    dicts = []
+    for i in range(len(para_layers)):
+        d_tot, layers = para_layers[i]
+        ### The depth of the top of the ith parasequence:
+        offset = para_boundaries[i]
 
         ### Construct a dictionary with sieve parameters for the current parasequence:
         para_dict = dict()
         x_parasequence = []
         y_parasequence = []
-        dy_dx_parasequence = []
-        dy_dx2_parasequence = []
-        dy_dx3_parasequence = []
         for j in range(len(lithologies)):
             #### SIEVE 1 PARAMETERS: value range:
             x_layer = syn.consistent_range(layers[j], layers[j+1], res)
@@ -187,144 +385,149 @@ def sequencer(depths: list, lithologies: list, layout: dict, res: float, n: int,
             sieve_1 = (min(y_layer), max(y_layer))
             #### SIEVE 2 PARAMETERS: derivative sign:
             derivative = np.cos((2 * np.pi) / d_tot * x_layer) * ((2 * np.pi) / d_tot)
-            # sieve_2 = (min(derivative), max(derivative))
             sieve_2 = syn.assign_sign(derivative, 0.75)
             #### SIEVE 3 PARAMETERS: second derivative sign:
             derivative2 = -np.sin((2 * np.pi) / d_tot * x_layer) * ((2 * np.pi) / d_tot) ** 2
-            # sieve_3 = (min(derivative2), max(derivative2))
             sieve_3 = syn.assign_sign(derivative2, 0.75)
             #### SIEVE 4 PARAMETERS: third derivative sign:
             derivative3 = -np.cos((2 * np.pi) / d_tot * x_layer) * ((2 * np.pi) / d_tot) ** 3
-            # sieve_4 = (min(derivative3), max(derivative3))
             sieve_4 = syn.assign_sign(derivative3, 0.75)
 
-            #### Update the dictionary and the segmented profiles:
+            #### Update the dictionary and write the layer into the profile, skipping its shared first sample:
             para_dict[lithologies[j]] = [sieve_1, sieve_2, sieve_3, sieve_4]
-            if i == 0:
-                x_parasequence.append(x_layer)
-            else:
-                x_parasequence.append(x_layer + x_segmented[i-1][-1][-1])
+            x_layer = x_layer + offset
+            if profile is not None:
+                first = 0 if position == 0 else 1
+                end = position + len(x_layer) - first
+                profile[0, position:end] = x_layer[first:]
+                profile[1, position:end] = y_layer[first:]
+                profile[2, position:end] = derivative[first:]
+                profile[3, position:end] = derivative2[first:]
+                profile[4, position:end] = derivative3[first:]
+                position = end
+            x_parasequence.append(x_layer)
             y_parasequence.append(y_layer)
-            dy_dx_parasequence.append(derivative)
-            dy_dx2_parasequence.append(derivative2)
-            dy_dx3_parasequence.append(derivative3)
 
         ### Update all of the storages:
         dicts.append(para_dict)
-        x_segmented.append(x_parasequence)
-        y_segmented.append(y_parasequence)
-        dy_dx_segmented.append(dy_dx_parasequence)
-        dy_dx2_segmented.append(dy_dx2_parasequence)
-        dy_dx3_segmented.append(dy_dx3_parasequence)
-        para_boundaries.append(x_segmented[i][-1][-1])
-        if i == 0:
-            layer_boundaries.append(layers)
-        else:
-            layer_boundaries.append(layers + x_segmented[i-1][-1][-1])
-
-        ### Plot the i-th parasequence:
-        for j in range(len(x_parasequence)):
-            plt.plot(y_parasequence[j], x_parasequence[j], color=layout[lithologies[j]][0], lw=2)
-            plt.hlines(layer_boundaries[i][j], -1, 1)
-            plt.text(1.1, ((layer_boundaries[i][j + 1] + layer_boundaries[i][j]) / 2), lithologies[j],
-                     va='center', ha='center')
-        plt.vlines(0, min(x_parasequence[0]), max(x_parasequence[-1]), linestyle='--')
-        plt.xlim(-1, 1)
-        plt.yticks(np.arange(min(x_parasequence[0]), max(x_parasequence[-1]) + res * 10, res * 10))
-        plt.ylim(max(x_parasequence[-1]), min(x_parasequence[0]))
-        plt.ylabel('Depth [m]')
-        plt.title('(Para)sequence no.' + str(i + 1), weight='bold')
-        if filepath is None:
-            plt.show()
-        else:
-            plt.savefig(filepath + '\Parasequence no.' + str(i + 1) + '.png', bbox_inches='tight')
-        plt.close()
+        if segments:
+            x_segmented.append(x_parasequence)
+            y_segmented.append(y_parasequence)
+        para_boundaries.append(x_parasequence[-1][-1])
+        layer_boundaries.append(layers + offset)
 
     ## Normalize the dictionaries such that the value ranges extent fully from -1 to 1:
     for para_dict in dicts:
         syn.dict_normalizer(para_dict, [0])
+    return profile, para_boundaries, layer_boundaries, dicts, x_segmented, y_segmented
 
-    # Plot the full sinusoid profile:
-    ## Create figure and axes:
-    fig, axes = plt.subplots(nrows=1, ncols=2)
-    fig.set_size_inches(6, 4*len(dicts))
-    ## Plot the sine curve and layer boundaries:
-    ### For every parasequence:
-    for i in range(n):
-        #### Plot each layer with its own color, label and horizontal boundary:
-        for j in range(len(y_segmented[i])):
-            axes[0].plot(y_segmented[i][j], x_segmented[i][j], color=layout[lithologies[j]][0], lw=2)
-            axes[0].hlines(layer_boundaries[i][j], -1, 1, lw=1, linestyle='-.')
-    ## Plot center-line:
-    axes[0].vlines(0, 0, max(x_segmented[-1][-1]))
-    ## Plot the parasequence boundaries and labels:
-    for i in range(n):
-        ### Parasequence boundaries:
-        axes[0].hlines(para_boundaries[i], -1, 1, lw=2, linestyle='--')
-        axes[1].hlines(para_boundaries[i], 0, 0.2, lw=2, linestyle='-')
-        ### Parasequence label:
-        para_thickness = para_boundaries[i+1] - para_boundaries[i]
-        axes[0].text(1.1, para_boundaries[i] + (para_thickness / 2), 'n = ' + str(i + 1) +
-                     '\n' + str(round(para_thickness, 1)) + 'm')
-    ## Add a lithology bar:
-    ### Create indents:
-    indents = np.linspace(0.5, 0.25, len(lithologies))
-    indent_dict = {}
-    for i in range(len(lithologies)):
-        indent_dict[lithologies[i]] = indents[i]
-    ### Create the lithology bar with indents:
-    for i in range(n):
-        for j in range(len(lithologies)):
-            #### Add lithology patch:
-            axes[1].add_patch(patches.Rectangle((0, layer_boundaries[i][j]), indent_dict[lithologies[j]],
-                                                layer_boundaries[i][j + 1] - layer_boundaries[i][j], edgecolor='black',
-                                                hatch=layout[lithologies[j]][1], facecolor=layout[lithologies[j]][0]))
-            #### Add layer thickness label:
-            layer_thickness = layer_boundaries[i][j+1] - layer_boundaries[i][j]
-            axes[1].text(0.525, layer_boundaries[i][j] + layer_thickness / 2, str(round(layer_thickness, 1)) + 'm')
-    ## Limits, labels, titles:
-    ### Axes 0:
-    axes[0].set_xlim(-1, 1)
-    axes[0].set_ylim(max(x_segmented[-1][-1]), min(x_segmented[0][0]))
-    axes[0].set_ylabel('Depth [m]')
-    axes[0].set_xlabel('Code value [-]')
-    axes[0].set_title('Vertical Profile - ' + str(n) + ' (Para)sequences' + '\n' + r'$\alpha$ = ' + str(alpha) + 'm, '
-                      + r'$\beta$ = ' + str(beta) + 'm', weight='bold')
-    ### Axes 1:
-    axes[1].set_xlim(0, 0.2)
-    axes[1].set_ylim(max(x_segmented[-1][-1]), min(x_segmented[0][0]))
-    axes[1].set_xticks(indents)
-    axes[1].set_xticklabels(lithologies, weight='semibold', fontsize='medium', rotation=90)
-    axes[1].set_yticks([])
-    axes[1].set_title('Lithologies:', weight='semibold', fontsize=10)
-
-    ### Save or show the figure:
-    if filepath is None:
-        plt.show()
-    else:
-        plt.subplots_adjust(wspace=0.4)
-        plt.savefig(filepath + '\Full Vertical Profile.png', dpi=fig.dpi, bbox_inches='tight')
-    plt.close(fig)
 
-    ## If asymmetric = True, return list of lithologies and depths:
-    if asymmetric:
-        asymmetric_lithologies = []
-        asymmetric_depths = [0]
-        for i in range(n):
-            asymmetric_lithologies += lithologies
-            for j in range(len(layer_boundaries[i])):
-                if j > 0:
-                    asymmetric_depths.append(layer_boundaries[i][j])
-                else:
-                    pass
-        return asymmetric_depths, asymmetric_lithologies
+# realizations = sequencer_batch(depths, lithologies, res, n, K, alpha=0, beta=0, psi=0, omega=0, seed=None,
+#                                dense=False, dtype=np.float64):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## depths, lithologies, res, n, alpha, beta, psi, omega: see sequencer().
+## K: int; the number of realizations.
+## seed [optional]: int or numpy.random.Generator from which all thicknesses are drawn. Default = None.
+## dense [optional]: if True, the sampled profiles are returned instead of the depths and lithologies. Default = False.
+## dtype [optional]: the floating point type of the sampled profiles, see sequencer(). Default = np.float64.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## realizations: a list of length K containing a tuple per realization; (depths, lithologies) as returned by
+##               sequencer() with asymmetric=True, or (x, y, derivatives, para_boundaries, dicts) as returned by
+##               sequencer() if 'dense' is True. The (depths, lithologies) tuples can be passed to batch.main_batch().
+## The realizations follow the same distributions as sequencer(), but all parasequence thicknesses and all layer
+## thicknesses of all K realizations are drawn in one vectorized sample each, and no figures are made.
 
-    # Concatenate all of the arrays to create continuous profiles:
-    x = syn.matrix_concatenator([syn.matrix_concatenator(x_segmented[i]) for i in range(len(x_segmented))])
-    y = syn.matrix_concatenator([syn.matrix_concatenator(y_segmented[i]) for i in range(len(y_segmented))])
-    dy = syn.matrix_concatenator([syn.matrix_concatenator(dy_dx_segmented[i]) for i in range(len(dy_dx_segmented))])
-    dy2 = syn.matrix_concatenator([syn.matrix_concatenator(dy_dx2_segmented[i]) for i in range(len(dy_dx2_segmented))])
-    dy3 = syn.matrix_concatenator([syn.matrix_concatenator(dy_dx3_segmented[i]) for i in range(len(dy_dx3_segmented))])
 
-    derivatives = [dy, dy2, dy3]
-    return x, y, derivatives, para_boundaries, dicts
+def sequencer_batch(depths: list, lithologies: list, res: float, n: int, K: int, alpha: float = 0, beta: float = 0,
+                    psi: float = 0, omega: float = 0, seed=None, dense: bool = False, dtype=np.float64) -> list:
+    rng = np.random.default_rng(seed)
+    # Calibrate 'depths' to start at 0:
+    depths = np.asarray(depths, dtype=float)
+    depths = depths - depths[0]
+    thicknesses = np.diff(depths)
+
+    # Draw the total thickness of every parasequence of every realization, shape (K, n):
+    d_tot = np.full((K, n), depths[-1])
+    if alpha != 0:
+        mu_corrected = st.corrected_mean(omega, depths[-1], alpha)
+        p_left, p_right, mu_left, mu_right = st.split_means(omega, mu_corrected, alpha, psi)
+        ## Compensational stacking: alternate between the left and right distributions, starting at either:
+        left_start = rng.integers(0, 2, size=K).astype(bool)
+        left = (np.arange(n) % 2 == 0)[None, :] == left_start[:, None]
+        d_tot = st.skewed_norm_sample(omega, np.where(left, mu_left, mu_right), alpha, rng)
+
+    # Draw the layer thicknesses, shape (K, n, M), and normalize them to the parasequence thickness:
+    layer_thicknesses = np.broadcast_to(thicknesses, (K, n, len(thicknesses)))
+    if beta != 0:
+        layer_thicknesses = st.skewed_norm_sample(omega, layer_thicknesses, beta, rng)
+    para_thicknesses = np.cumsum(layer_thicknesses, axis=2)
+    layers = np.concatenate((np.zeros((K, n, 1)), para_thicknesses), axis=2)
+    layers = layers / para_thicknesses[:, :, -1:] * d_tot[:, :, None]
+
+    if dense:
+        realizations = []
+        for k in range(K):
+            profile, para_boundaries, layer_boundaries, dicts = \
+                layer_profile(list(zip(d_tot[k], layers[k])), lithologies, res, dtype=dtype)[:4]
+            realizations.append((profile[0], profile[1], [profile[2], profile[3], profile[4]], para_boundaries, dicts))
+        return realizations
+
+    # The same check on the layer thicknesses as in layer_profile():
+    counts = 1 + np.round(np.diff(layers, axis=2) / res)
+    if np.any(counts < 1):
+        k, i, j = np.argwhere(counts < 1)[0]
+        raise ValueError('Layer ' + str(j + 1) + ' of parasequence ' + str(i + 1) + ' of realization ' + str(k + 1) +
+                         ' has a negative thickness (' + str(layers[k, i, j + 1] - layers[k, i, j]) +
+                         ' m); lower alpha, beta or omega.')
+    # The layer boundaries below the top of the profile, offset by the depth of the top of their parasequence:
+    offsets = np.concatenate((np.zeros((K, 1)), np.cumsum(layers[:, :-1, -1], axis=1)), axis=1)
+    boundaries = (layers[:, :, 1:] + offsets[:, :, None]).reshape(K, -1)
+    return [([0] + boundaries[k].tolist(), list(lithologies) * n) for k in range(K)]
+
+
+# parasequences = sequencer_stream(depths, lithologies, res, n, alpha=0, beta=0, psi=0, omega=0, seed=None,
+#                                  dtype=np.float64):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## depths, lithologies, res, n, alpha, beta, psi, omega, dtype: see sequencer().
+## seed [optional]: int or numpy.random.Generator from which all thicknesses are drawn. Default = None, in which case
+##                  they are drawn from the global 'random' and 'numpy.random' states, giving the same section as
+##                  sequencer() after the same random.seed() and numpy.random.seed().
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## parasequences: a generator yielding for each of the n parasequences a tuple (x, y, derivatives, boundaries,
+##                para_dict):
+##      x, y, derivatives: the samples of the parasequence, as in sequencer(). Every parasequence after the first
+##                         starts with the last sample of the one above and ends before its own last sample, which is
+##                         yielded with the next parasequence; concatenated, they make up the profile of sequencer().
+##      boundaries: a list [top, bottom] containing the x-values of the boundaries of the parasequence.
+##      para_dict: a dictionary with value ranges/signs for each lithology of the parasequence.
+## Only one parasequence is drawn and sampled at a time, so the memory used does not grow with n. No figures are made.
+
+
+def sequencer_stream(depths: list, lithologies: list, res: float, n: int, alpha: float = 0, beta: float = 0,
+                     psi: float = 0, omega: float = 0, seed=None, dtype=np.float64):
+    rng = None if seed is None else np.random.default_rng(seed)
+    # Calibrate 'depths' to start at 0:
+    depths = np.asarray(depths, dtype=float)
+    depths = depths - depths[0]
+
+    top = 0
+    carry = None
+    para_layers = parasequence_layers(depths, lithologies, n, alpha=alpha, beta=beta, psi=psi, omega=omega, rng=rng)
+    for i, (d_tot, layers) in enumerate(para_layers):
+        profile, para_boundaries, layer_boundaries, dicts = \
+            layer_profile([(d_tot, layers)], lithologies, res, dtype=dtype, offset=top, index=i)[:4]
+        ## Hand the last sample on to the next parasequence, as the profile reader assigns it to the one below:
+        chunk = profile if i == n - 1 else profile[:, :-1]
+        if carry is not None:
+            chunk = np.concatenate((carry, chunk[:, 1:]), axis=1)
+        carry = profile[:, -1:]
+        yield chunk[0], chunk[1], [chunk[2], chunk[3], chunk[4]], para_boundaries, dicts[0]
+        top = para_boundaries[1]
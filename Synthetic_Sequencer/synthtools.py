@@ -1,4 +1,6 @@
 import numpy as np
+# Custom imports:
+from Numerical_Tools import faciesseq as fs
 
 
 # concatenated_array = matrix_concatenator(array_list):
@@ -14,10 +16,8 @@ import numpy as np
 
 
 def matrix_concatenator(array_list):
-    concatenated_array = array_list[0]
-    for i in range(1, len(array_list)):
-        concatenated_array = np.hstack((concatenated_array, np.delete(array_list[i], 0)))
-    return concatenated_array
+    # Join all arrays in one copy, rather than growing the result array by array:
+    return np.concatenate([np.asarray(array_list[0])] + [np.asarray(array)[1:] for array in array_list[1:]])
 
 
 # dictio = dict_normalizer(dictio, indices):
@@ -83,11 +83,26 @@ def reverse_dict(dictionary: dict) -> dict:
 
 
 def consistent_range(start, stop, step):
-    num = 1 + int(round((stop - start) / step, 0))
+    num = range_count(start, stop, step)
     array = np.linspace(start, stop, num, endpoint=True)
     return array
 
 
+# num = range_count(start, stop, step):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## start, stop, step: see consistent_range().
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## num: the length of consistent_range(start, stop, step), without creating the array.
+
+
+def range_count(start, stop, step) -> int:
+    return 1 + int(round((stop - start) / step, 0))
+
+
 # sign = assign_sign(profile, threshold):
 # ======================================================================================================================
 # INPUT:
@@ -102,13 +117,9 @@ def consistent_range(start, stop, step):
 
 
 def assign_sign(profile, threshold):
-    pos_count = 0
-    neg_count = 0
-    for k in range(len(profile)):
-        if profile[k] > 0:
-            pos_count += 1
-        if profile[k] < 0:
-            neg_count += 1
+    profile = np.asarray(profile)
+    pos_count = np.count_nonzero(profile > 0)
+    neg_count = np.count_nonzero(profile < 0)
     if (pos_count / len(profile)) >= threshold:
         sign = 'pos'
     elif (neg_count / len(profile)) >= threshold:
@@ -118,19 +129,23 @@ def assign_sign(profile, threshold):
     return sign
 
 
-# flagged_profile = coded_to_flagged(depth_profile, code_profile, code_dict):
+# flagged_profile = coded_to_flagged(code_profile, code_dict, compact=False):
 # ======================================================================================================================
 # INPUT:
 # ======================================================================================================================
 ## code_profile: an array of length N, containing the facies codes for each depth value.
 ## code_dict: a dictionary containing as key:value pairs 'code:lith'.
+## compact [optional]: if True, the profile is returned as a faciesseq.FaciesSequence, which stores one byte per depth
+##                     value instead of a reference to a string. Default = False.
 # ======================================================================================================================
 # OUTPUT:
 # ======================================================================================================================
-## flagged_profile: a list of length N, containing for each depth value the lithology.
+## flagged_profile: a list of length N, containing for each depth value the lithology; or a FaciesSequence.
 
 
-def coded_to_flagged(code_profile, code_dict):
+def coded_to_flagged(code_profile, code_dict, compact=False):
+    if compact:
+        return fs.FaciesSequence.from_codes(code_profile, code_dict)
     flagged_profile = []
     # For each code, retrieve its corresponding lithology and add it to the list:
     for i in range(len(code_profile)):
@@ -144,16 +159,21 @@ def coded_to_flagged(code_profile, code_dict):
 # INPUT:
 # ======================================================================================================================
 ## depth_profile: an array of length N, containing depth values. [m]
-## flagged_profile: a list of length N, containing for each depth value the lithology as string.
+## flagged_profile: a list of length N, containing for each depth value the lithology as string; or a
+##                  faciesseq.FaciesSequence.
 # ======================================================================================================================
 # OUTPUT:
 # ======================================================================================================================
 ## depths: a list of length (F + 1) containing the depths (in meters) at which lithology boundaries occur.
 ## lithologies: a list of length F containing the lithologies, as strings, corresponding to the lithological units
-##              defined by the boundaries in 'depths'.
+##              defined by the boundaries in 'depths'; a FaciesSequence if 'flagged_profile' is one.
 
 
 def flagged_reader(depth_profile, flagged_profile):
+    # A compact profile: find the facies changes on the integer codes at once:
+    if isinstance(flagged_profile, fs.FaciesSequence):
+        depths, codes = code_reader(depth_profile, flagged_profile.codes)
+        return depths, fs.FaciesSequence(codes, flagged_profile.classes)
     depths = [0]
     lithologies = [flagged_profile[0]]
     for i in range(1, len(flagged_profile)):
@@ -163,3 +183,73 @@ def flagged_reader(depth_profile, flagged_profile):
             lithologies.append(flagged_profile[i])
     depths.append(depth_profile[-1])
     return depths, lithologies
+
+
+# depths, lithologies = code_reader(depth_profile, code_profile, code_dict=None, compact=False):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## depth_profile: an array of length N, containing depth values. [m]
+## code_profile: an array of length N, containing the integer facies code for each depth value.
+## code_dict [optional]: a dictionary containing as key:value pairs 'code:lith'. Default = None.
+## compact [optional]: if True, the lithologies are returned as a faciesseq.FaciesSequence. Only used together with
+##                     'code_dict'. Default = False.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## depths: a list of length (F + 1) containing the depths (in meters) at which lithology boundaries occur.
+## lithologies: an integer array of length F containing the code of every lithological unit defined by the boundaries
+##              in 'depths'; or, if 'code_dict' is given, the lithologies as strings, as obtained from
+##              flagged_reader(depth_profile, coded_to_flagged(code_profile, code_dict, compact)). The facies changes
+##              are found on the codes at once, without building a list of strings per depth value.
+
+
+def code_reader(depth_profile, code_profile, code_dict: dict = None, compact: bool = False):
+    return chunked_code_reader([(depth_profile, code_profile)], code_dict=code_dict, compact=compact)
+
+
+# depths, lithologies = chunked_code_reader(chunks, code_dict=None, compact=False):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## chunks: an iterable of (depth_chunk, code_chunk) tuples containing consecutive parts of a log, each an array of
+##         depth values and an array of the corresponding integer facies codes. E.g. a generator reading a long log
+##         from file, such as ((chunk.iloc[:, 0].to_numpy(), chunk.iloc[:, 1].to_numpy()) for chunk in
+##         pd.read_csv(path, chunksize=10**6)).
+## code_dict, compact [optional]: see code_reader().
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## depths, lithologies: see code_reader(); identical to the output for the concatenated chunks. Only the bed
+##                      boundaries are kept in memory, never more than one chunk of depth values.
+
+
+def chunked_code_reader(chunks, code_dict: dict = None, compact: bool = False):
+    depth_parts = []
+    code_parts = []
+    last_code = None
+    for depth_chunk, code_chunk in chunks:
+        depth_chunk = np.asarray(depth_chunk)
+        code_chunk = np.asarray(code_chunk)
+        if len(code_chunk) != len(depth_chunk):
+            raise ValueError('Every chunk needs as many codes as depth values, not ' + str(len(code_chunk)) +
+                             ' and ' + str(len(depth_chunk)) + '.')
+        if len(code_chunk) == 0:
+            continue
+        ## The first sample of every bed; a chunk starts a new bed if its first code differs from the last one read:
+        starts = np.flatnonzero(code_chunk[1:] != code_chunk[:-1]) + 1
+        if last_code is None:
+            code_parts.append(code_chunk[:1])
+        elif code_chunk[0] != last_code:
+            starts = np.r_[0, starts]
+        depth_parts.append(depth_chunk[starts])
+        code_parts.append(code_chunk[starts])
+        last_code, last_depth = code_chunk[-1], depth_chunk[-1]
+    if last_code is None:
+        raise ValueError('The log contains no depth values.')
+    depths = [0] + np.concatenate(depth_parts).tolist() + [last_depth]
+    codes = np.concatenate(code_parts)
+    if code_dict is None:
+        return depths, codes
+    lithologies = fs.FaciesSequence.from_codes(codes, code_dict)
+    return depths, lithologies if compact else lithologies.tolist()
@@ -5,6 +5,7 @@ from matplotlib import patches
 from matplotlib import lines
 # Custom imports:
 from Synthetic_Sequencer import synthtools as syn
+from Post_Burgess import idealseq
 
 # matrix_imager(tp_matrix, classes, facies_dict, layout, filepath, title=None):
 # ======================================================================================================================
@@ -82,17 +83,8 @@ def matrix_imager(tp_matrix: np.ndarray, classes: list, facies_dict: dict, layou
     if ideal:
         lith_bar = np.ones((F, 1))
         axes[1].imshow(lith_bar)
-        ### Find the sum value in the (j=1,j=-F) and (j=-1,j=F) diagonal pairs:
-        diag_sum_pos = tp_matrix[0, 0]
-        diag_sum_neg = tp_matrix[F-1, F-1]
-        for i in range(F-1):
-            #### The j=1th diagonal:
-            diag_sum_pos += tp_matrix[(F-1)-i, 1+i]
-            #### The j=-1th diagonal:
-            diag_sum_neg += tp_matrix[(F-2)-i, i]
-        ### If the (j=1,j=-F) diagonal has the highest sum value, reverse the row labels:
-        if diag_sum_pos > diag_sum_neg:
-            x_labels.reverse()
+        ### Read the ideal sequence from the (j=1,j=-F) or (j=-1,j=F) diagonal pair with the highest sum value:
+        x_labels = idealseq.ideal_order(tp_matrix, facies_dict)
         ### Add lithology bar in order of the row labels:
         for i in range(len(x_labels)):
             axes[1].add_patch(patches.Rectangle((-0.5, -0.5 + i), 1, 1, edgecolor='black',
@@ -0,0 +1,125 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import matplotlib
+from matplotlib import pyplot as plt
+# Custom imports:
+from Visualization_Tools import profile_visualizers as pv
+from Visualization_Tools import matrix_visualizers as mv
+from Post_Burgess import idealseq
+from Burgess_Model import telemetry as tm
+
+# The figure functions that can be rendered as a job, by name:
+RENDERERS = {'vertical_profile': pv.vertical_profile,
+             'coded_profile': pv.coded_profile,
+             'matrix_imager': mv.matrix_imager,
+             'ideal_sequencer': idealseq.ideal_sequencer}
+
+
+# path = figure_path(filepath, fmt='png'):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## filepath: string containing the directory and filename of a figure.
+## fmt [optional]: the output format, e.g. 'png', 'pdf' or 'svg'. Default = 'png'.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## path: 'filepath' with its extension replaced by 'fmt'; matplotlib picks the output format from the extension.
+
+
+def figure_path(filepath: str, fmt: str = 'png') -> str:
+    return os.path.splitext(filepath)[0] + '.' + fmt
+
+
+# init_renderer(dpi=None):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## dpi [optional]: the resolution of the figures in dots per inch. Default = None (matplotlib's default).
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## Switches the worker process to the non-interactive Agg backend and sets the figure resolution.
+
+
+def init_renderer(dpi: float = None) -> None:
+    matplotlib.use('Agg')
+    if dpi is not None:
+        matplotlib.rcParams['figure.dpi'] = dpi
+
+
+# filepath = render_job(job):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## job: a tuple (name, args, kwargs); calls RENDERERS[name](*args, **kwargs). The keyword arguments must contain the
+##      'filepath' to which the figure is saved.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## filepath: the filepath of the saved figure.
+
+
+def render_job(job: tuple) -> str:
+    name, args, kwargs = job
+    RENDERERS[name](*args, **kwargs)
+    return kwargs['filepath']
+
+
+# filepaths = render_jobs(jobs, workers=None, queue_depth=None, dpi=None, callback=None):
+# ======================================================================================================================
+# INPUT:
+# ======================================================================================================================
+## jobs: a list of (name, args, kwargs) tuples, see render_job(). Jobs must save to different filepaths.
+## workers [optional]: int; the number of worker processes. Default = None, in which case the jobs are rendered one
+##                     by one in the current process.
+## queue_depth [optional]: int; the maximum number of jobs submitted to the pool at any time, which bounds the memory
+##                         taken by pending figure data. Default = None (two per worker).
+## dpi [optional]: the resolution of the figures in dots per inch. Default = None (matplotlib's default).
+## callback [optional]: a function callback(done, total) called after every saved figure, e.g. as obtained from
+##                      telemetry.progress_callback(). Default = None, in which case telemetry.progress_bar() is
+##                      drawn.
+# ======================================================================================================================
+# OUTPUT:
+# ======================================================================================================================
+## filepaths: a list containing the filepath of every saved figure, in the order of 'jobs'. The figures are the same
+##            as when the figure functions are called directly.
+
+
+def render_jobs(jobs: list, workers: int = None, queue_depth: int = None, dpi: float = None,
+                callback=None) -> list:
+    filepaths = [None] * len(jobs)
+    done = 0
+    if callback is None:
+        callback = tm.progress_bar
+
+    def progress():
+        callback(done, len(jobs))
+
+    # Render in the current process:
+    if workers is None:
+        with plt.rc_context({} if dpi is None else {'figure.dpi': dpi}):
+            for i in range(len(jobs)):
+                filepaths[i] = render_job(jobs[i])
+                done += 1
+                progress()
+        return filepaths
+
+    # Render in a pool of Agg workers, never keeping more than 'queue_depth' jobs in flight:
+    if queue_depth is None:
+        queue_depth = 2 * workers
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_renderer, initargs=(dpi,)) as executor:
+        pending = {}
+        for i in range(len(jobs)):
+            if len(pending) >= queue_depth:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    filepaths[pending.pop(future)] = future.result()
+                    done += 1
+                    progress()
+            pending[executor.submit(render_job, jobs[i])] = i
+        for future in list(pending):
+            filepaths[pending.pop(future)] = future.result()
+            done += 1
+            progress()
+    return filepaths